@@ -4,21 +4,29 @@ from pathlib import Path
 from nonebot.rule import Rule
 from nonebot.log import logger
 from nonebot.typing import T_State
+from nonebot.utils import run_sync
 from nonebot.adapters import Bot as rBot
-from nonebot import on_notice, on_command
 from nonebot.adapters import Event as rEvent
+from nonebot.adapters.onebot.v11 import Bot, Message
+from nonebot import on_notice, get_driver, on_command
 from nonebot.adapters.onebot.v11.exception import ActionFailed
-from nonebot.adapters.onebot.v11 import Bot, Message, MessageSegment
 from nonebot.adapters.onebot.v11.event import (
     NoticeEvent,
     MessageEvent,
     GroupMessageEvent,
 )
 
-from .__meta__ import SAFE_GROUP
-from .data_export import gnrtGachaFile
+from .worker_pool import PoolBusyError
 from .data_import import importGachaFile
-from .data_render import gnrtGachaInfo, gnrtGachaArchieve
+from .__meta__ import SAFE_GROUP, IMPORT_SIZE
+from .data_export import EXPORT_POOL, EXPORT_NAMES, gnrtBackupZip, gnrtGachaFile
+from .data_render import (
+    RENDER_POOL,
+    loadAssets,
+    imageSegment,
+    gnrtGachaInfo,
+    gnrtGachaArchieve,
+)
 from .data_source import (
     logsHelper,
     checkAuthKey,
@@ -34,19 +42,32 @@ async def _OFFLINE_FILE(bot: "rBot", event: "rEvent") -> bool:
             if hasattr(event, "user_id") and hasattr(event, "file"):
                 file = dict(event.file)  # type: ignore
                 filename = file["name"].lower()
-                # 响应 5M 及以下符合规则的 JSON、BAK 文件
+                # 响应大小不超过导入上限且符合规则的 JSON、BAK 文件
                 if filename.endswith("json") or (
                     filename.startswith("gachalogs-") and filename.endswith(".bak")
                 ):
-                    return int(file["size"]) <= 5 * 1024 * 1024
+                    return int(file["size"]) <= IMPORT_SIZE * 1024 * 1024
     return False
 
 
 mainMatcher = on_command("抽卡记录", aliases={"ckjl"}, priority=5)
 aMatcher = on_command("抽卡成就", aliases={"ckcj"}, priority=5)
 eMatcher = on_command("抽卡记录导出", aliases={"logexp", "ckjldc"}, priority=5)
+zMatcher = on_command("抽卡记录打包", aliases={"logzip", "ckjldb"}, priority=5)
 dMatcher = on_command("抽卡记录删除", aliases={"logdel", "ckjlsc"}, priority=5)
 fMatcher = on_notice(rule=Rule(_OFFLINE_FILE))
+driver = get_driver()
+
+
+@driver.on_startup
+async def _startPools() -> None:
+    # 绘图进程池须在 run_sync 等使用线程前创建工作进程，启动函数本身也不能是同步函数
+    RENDER_POOL.start()
+    await run_sync(loadAssets)()
+
+
+driver.on_shutdown(RENDER_POOL.shutdown)
+driver.on_shutdown(EXPORT_POOL.shutdown)
 
 
 @mainMatcher.handle()
@@ -166,8 +187,11 @@ async def mainGot(bot: Bot, event: MessageEvent, state: T_State):
         await mainMatcher.send(data["msg"], at_sender=True)
     if not data.get("logs", {}):
         await mainMatcher.finish()
-    imgB64 = await gnrtGachaInfo(data["logs"], data["uid"])
-    await mainMatcher.finish(MessageSegment.image(imgB64))
+    try:
+        imgB64 = await gnrtGachaInfo(data["logs"], data["uid"])
+    except PoolBusyError:
+        await mainMatcher.finish("当前绘图任务较多，请稍后再试！", at_sender=True)
+    await mainMatcher.finish(await imageSegment(imgB64))
 
 
 @aMatcher.handle()
@@ -181,8 +205,11 @@ async def gachaAchievement(bot: Bot, event: MessageEvent, state: T_State):
     uid, logs = await logsHelper(cfg["logs"])
     if not logs:
         await aMatcher.finish("没有抽卡记录可供分析哦~", at_sender=True)
-    imgB64 = await gnrtGachaArchieve(logs, uid)
-    await aMatcher.finish(MessageSegment.image(imgB64))
+    try:
+        imgB64 = await gnrtGachaArchieve(logs, uid)
+    except PoolBusyError:
+        await aMatcher.finish("当前绘图任务较多，请稍后再试！", at_sender=True)
+    await aMatcher.finish(await imageSegment(imgB64))
 
 
 @eMatcher.handle()
@@ -192,7 +219,7 @@ async def gachaExport(bot: Bot, event: MessageEvent, state: T_State):
         event.group_id not in SAFE_GROUP
     )  # type: ignore
     # 提取导出目标 QQ 及导出方式
-    target = {"qq": qq, "type": "xlsx"}
+    target, compress, xlsxAsked = {"qq": qq, "type": "xlsx"}, False, False
     for msgSeg in event.message:
         if msgSeg.type == "at":
             target["qq"] = msgSeg.data["qq"]
@@ -204,6 +231,21 @@ async def gachaExport(bot: Bot, event: MessageEvent, state: T_State):
                 target["type"] = "url"
             elif any(x in text for x in ["统一", "标准", "uigf", "json"]):
                 target["type"] = "json"
+            elif "csv" in text:
+                target["type"] = "csv"
+            elif any(x in text for x in ["parquet", "arrow"]):
+                target["type"] = "parquet"
+            xlsxAsked = xlsxAsked or any(x in text for x in ["表格", "excel", "xlsx"])
+            compress = compress or any(x in text for x in ["压缩", "gzip", "gz"])
+    # 压缩仅适用于 UIGF JSON，未指定格式时导出压缩的 JSON，表格本身已是压缩格式
+    if compress and target["type"] == "xlsx" and xlsxAsked:
+        await eMatcher.finish("表格文件本身已是压缩格式，无法再压缩哦！", at_sender=True)
+    if compress and target["type"] in ["csv", "parquet"]:
+        await eMatcher.finish(
+            f"{EXPORT_NAMES[target['type']]} 文件暂不支持压缩导出哦！", at_sender=True
+        )
+    if compress and target["type"] in ["xlsx", "json"]:
+        target["type"] = "json.gz"
     if target["qq"] != qq and qq not in bot.config.superusers:
         await eMatcher.finish("你没有权限导出该用户抽卡记录！")
     # 读取配置数据
@@ -221,8 +263,12 @@ async def gachaExport(bot: Bot, event: MessageEvent, state: T_State):
             await eMatcher.finish()
         except ActionFailed:
             await eMatcher.finish("导不出来，因为发送悄悄话失败辣..", at_sender=True)
+
     # 发送导出文件
-    fileInfo = await gnrtGachaFile(cfg, target["type"])  # type: ignore
+    async def onQueued(position: int) -> None:
+        await eMatcher.send(f"当前导出任务较多，已排在第 {position} 位，请耐心等待~", at_sender=True)
+
+    fileInfo = await gnrtGachaFile(cfg, target["type"], qq, onQueued)  # type: ignore
     if fileInfo.get("error"):
         await eMatcher.finish(fileInfo["error"], at_sender=True)
     # 尝试发送文件
@@ -247,6 +293,38 @@ async def gachaExport(bot: Bot, event: MessageEvent, state: T_State):
         await eMatcher.finish("导不出来，因为文件发送出错辣..", at_sender=True)
 
 
+@zMatcher.handle()
+async def gachaBackup(bot: Bot, event: MessageEvent, state: T_State):
+    qq = event.get_user_id()
+    if qq not in bot.config.superusers:
+        await zMatcher.finish("你没有权限打包导出全部用户抽卡记录！")
+    # 提取导出格式，打包默认导出 UIGF JSON 以便备份及导入
+    text = str(event.get_plaintext()).replace("ckjldb", "").lower()
+    outFormat = "json"
+    if any(x in text for x in ["表格", "excel", "xlsx"]):
+        outFormat = "xlsx"
+    elif "csv" in text:
+        outFormat = "csv"
+    elif any(x in text for x in ["parquet", "arrow"]):
+        outFormat = "parquet"
+    if any(x in text for x in ["压缩", "gzip", "gz"]):
+        # 压缩仅适用于 UIGF JSON，不再静默忽略其他格式的压缩要求
+        if outFormat != "json":
+            await zMatcher.finish(f"{EXPORT_NAMES[outFormat]} 文件暂不支持压缩打包哦！")
+        outFormat = "json.gz"
+
+    # 每完成约 1/5 报告一次进度
+    async def onProgress(done: int, total: int) -> None:
+        if done < total and done % max(total // 5, 1) == 0:
+            await zMatcher.send(f"打包进度 {done}/{total}，请耐心等待~")
+
+    await zMatcher.send("开始打包导出全部用户抽卡记录，请耐心等待~")
+    zipInfo = await gnrtBackupZip(outFormat, onProgress)  # type: ignore
+    if zipInfo.get("error"):
+        await zMatcher.finish(zipInfo["error"])
+    await zMatcher.finish(f"{zipInfo['msg']}\n打包文件已保存至 {zipInfo['path']}")
+
+
 @dMatcher.handle()
 async def gachaDelete(bot: Bot, event: MessageEvent, state: T_State):
     # 提取目标 QQ 号、确认情况
@@ -329,4 +407,4 @@ async def gotFile(bot: Bot, event: NoticeEvent, state: T_State):
         await fMatcher.finish(str(importRes.get("error")) or "导入发生异常！")
     await fMatcher.send(str(importRes["msg"]))
     if importRes.get("img"):
-        await mainMatcher.finish(MessageSegment.image(importRes["img"]))
+        await mainMatcher.finish(await imageSegment(importRes["img"]))  # type: ignore
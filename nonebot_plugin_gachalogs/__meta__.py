@@ -1,8 +1,12 @@
 import json
 from time import time
+from hashlib import md5
+from os import cpu_count
 from pathlib import Path
-from typing import Union
+from bisect import bisect_right
+from functools import lru_cache
 from datetime import datetime, timezone, timedelta
+from typing import Dict, List, Union, Literal, FrozenSet, NamedTuple
 
 from httpx import stream
 from nonebot import get_driver
@@ -28,6 +32,35 @@ def datetime_with_tz(
     )
 
 
+@lru_cache(maxsize=65536)
+def timestamp_with_tz(t: str) -> int:
+    """
+    将 ``"%Y-%m-%d %H:%M:%S"`` 格式的 ``"Asia/Shanghai"`` 时区时间字符串转换为时间戳
+
+    按固定位置切片解析并缓存结果，格式不符时交由 ``datetime_with_tz()`` 解析或抛出异常
+
+    * ``param t: str`` 时间字符串
+    - ``return: int`` 时间戳
+    """  # noqa: E501
+
+    if len(t) == 19 and t[4] == t[7] == "-" and t[10] == " " and t[13] == t[16] == ":":
+        try:
+            return int(
+                datetime(
+                    int(t[:4]),
+                    int(t[5:7]),
+                    int(t[8:10]),
+                    int(t[11:13]),
+                    int(t[14:16]),
+                    int(t[17:19]),
+                    tzinfo=TZ,
+                ).timestamp()
+            )
+        except ValueError:
+            pass
+    return int(datetime_with_tz(t).timestamp())
+
+
 cfg = get_driver().config
 
 # 安全群组
@@ -38,6 +71,62 @@ SAFE_GROUP = (
 # 缓存过期秒数
 EXPIRE_SEC = int(cfg.gacha_expire_sec) if hasattr(cfg, "gacha_expire_sec") else 3600
 
+# 绘图任务池类型、并发数及排队数
+RENDER_POOL_MODE: Literal["thread", "process"] = (
+    "process"
+    if str(getattr(cfg, "gachalogs_render_pool", "thread")).lower() == "process"
+    else "thread"
+)
+RENDER_WORKERS = (
+    int(cfg.gachalogs_render_workers)
+    if hasattr(cfg, "gachalogs_render_workers")
+    else ((cpu_count() or 2) if RENDER_POOL_MODE == "process" else 2)
+)
+RENDER_QUEUE = (
+    int(cfg.gachalogs_render_queue) if hasattr(cfg, "gachalogs_render_queue") else 16
+)
+
+# 导出任务池并发数及排队数
+EXPORT_WORKERS = (
+    int(cfg.gachalogs_export_workers) if hasattr(cfg, "gachalogs_export_workers") else 1
+)
+EXPORT_QUEUE = (
+    int(cfg.gachalogs_export_queue) if hasattr(cfg, "gachalogs_export_queue") else 4
+)
+
+# 导入文件大小上限（MB）及下载超时（秒）
+IMPORT_SIZE = (
+    int(cfg.gachalogs_import_size) if hasattr(cfg, "gachalogs_import_size") else 20
+)
+IMPORT_TIMEOUT = (
+    float(cfg.gachalogs_import_timeout)
+    if hasattr(cfg, "gachalogs_import_timeout")
+    else 60.0
+)
+
+# 成就图块缓存数量
+ACHIEVE_CACHE = (
+    int(cfg.gachalogs_achieve_cache) if hasattr(cfg, "gachalogs_achieve_cache") else 128
+)
+
+# 图片编码格式、PNG 压缩等级及 WebP 有损压缩质量
+IMAGE_FORMAT = str(getattr(cfg, "gachalogs_image_format", "png")).lower()
+if IMAGE_FORMAT not in ["png", "png-rgb", "png-palette", "webp", "webp-lossy"]:
+    IMAGE_FORMAT = "png"
+IMAGE_COMPRESS = (
+    int(cfg.gachalogs_image_compress) if hasattr(cfg, "gachalogs_image_compress") else 6
+)
+IMAGE_QUALITY = (
+    int(cfg.gachalogs_image_quality) if hasattr(cfg, "gachalogs_image_quality") else 90
+)
+
+# 抽卡记录总数达到此值时使用 NumPy 向量化统计，设为 0 时禁用
+NUMPY_THRESHOLD = (
+    int(cfg.gachalogs_numpy_threshold)
+    if hasattr(cfg, "gachalogs_numpy_threshold")
+    else 20000
+)
+
 # 本地缓存目录
 LOCAL_DIR = (
     (Path(cfg.resources_dir) / "gachalogs")
@@ -47,6 +136,21 @@ LOCAL_DIR = (
 if not LOCAL_DIR.exists():
     LOCAL_DIR.mkdir(parents=True, exist_ok=True)
 
+# 图片是否以本地文件路径发送、图片文件保留秒数
+IMAGE_FILE = bool(getattr(cfg, "gachalogs_image_file", False))
+IMAGE_TTL = int(cfg.gachalogs_image_ttl) if hasattr(cfg, "gachalogs_image_ttl") else 600
+IMAGE_DIR = LOCAL_DIR / "images"
+if IMAGE_FILE and not IMAGE_DIR.exists():
+    IMAGE_DIR.mkdir(parents=True, exist_ok=True)
+
+# 导出文件缓存容量（MB），设为 0 时禁用
+EXPORT_CACHE = (
+    int(cfg.gachalogs_export_cache) if hasattr(cfg, "gachalogs_export_cache") else 100
+)
+EXPORT_DIR = LOCAL_DIR / "exports"
+if EXPORT_CACHE > 0 and not EXPORT_DIR.exists():
+    EXPORT_DIR.mkdir(parents=True, exist_ok=True)
+
 # 绘图字体
 PIL_FONT = (
     (Path(cfg.gachalogs_font))
@@ -119,6 +223,85 @@ if (not _pools.exists()) or datetime.fromisoformat(
             for chunk in r.iter_bytes():
                 f.write(chunk)
 POOL_INFO = json.loads(_pools.read_text(encoding="utf-8"))
+# 卡池信息摘要，UP 判断依赖卡池信息，卡池信息更新后须重建本地摘要
+POOL_DIGEST = md5(
+    json.dumps(POOL_INFO, ensure_ascii=False, sort_keys=True).encode("utf-8")
+).hexdigest()
+
+
+class PoolUp(NamedTuple):
+    """卡池 UP 物品信息"""
+
+    order: int  # 卡池在 POOL_INFO 中的序号
+    name: str  # 卡池名称
+    orange: FrozenSet[str]  # UP 五星物品
+    purple: FrozenSet[str]  # UP 四星物品
+
+
+class PoolIndex(NamedTuple):
+    """单个祈愿类型的卡池时间区间索引，各列表均按卡池开始时间排序"""
+
+    starts: List[float]  # 卡池开始时间戳
+    ends: List[float]  # 卡池结束时间戳
+    maxEnds: List[float]  # 卡池结束时间戳前缀最大值，用于查找重叠的卡池
+    pools: List[PoolUp]  # 卡池 UP 物品信息
+
+
+def gnrtPoolIndex(pools: List[Dict]) -> Dict[int, PoolIndex]:
+    """
+    卡池时间区间索引生成
+
+    * ``param pools: List[Dict]`` 卡池信息，即 ``POOL_INFO``
+    - ``return: Dict[int, PoolIndex]`` 以祈愿类型为键的卡池时间区间索引
+    """
+
+    index: Dict[int, PoolIndex] = {}
+    parsed = sorted(
+        (
+            datetime.fromisoformat(p["From"]).timestamp(),
+            datetime.fromisoformat(p["To"]).timestamp(),
+            order,
+            p,
+        )
+        for order, p in enumerate(pools)
+    )
+    for start, end, order, p in parsed:
+        idx = index.setdefault(int(p["Type"]), PoolIndex([], [], [], []))
+        idx.starts.append(start)
+        idx.ends.append(end)
+        idx.maxEnds.append(max(end, idx.maxEnds[-1]) if idx.maxEnds else end)
+        idx.pools.append(
+            PoolUp(
+                order,
+                p["Name"],
+                frozenset(p.get("UpOrangeList", [])),
+                frozenset(p.get("UpPurpleList", [])),
+            )
+        )
+    return index
+
+
+def getPoolUp(gachaType: Union[str, int], timestamp: float) -> List[PoolUp]:
+    """
+    查找指定祈愿类型在指定时间开放的卡池，二分查找无需解析卡池时间
+
+    * ``param gachaType: Union[str, int]`` 祈愿类型
+    * ``param timestamp: float`` 抽卡时间戳
+    - ``return: List[PoolUp]`` 卡池 UP 物品信息，按 ``POOL_INFO`` 顺序排列，正常情况下只有一个
+    """  # noqa: E501
+
+    idx = POOL_INDEX.get(int(gachaType))
+    if not idx:
+        return []
+    matched, i = [], bisect_right(idx.starts, timestamp) - 1
+    while i >= 0 and idx.maxEnds[i] >= timestamp:
+        if idx.ends[i] >= timestamp:
+            matched.append(idx.pools[i])
+        i -= 1
+    return sorted(matched) if len(matched) > 1 else matched
+
+
+POOL_INDEX = gnrtPoolIndex(POOL_INFO)
 
 # 卡池类型
 GACHA_TYPE_FULL = {
@@ -2,16 +2,159 @@
 # https://github.com/sunfkny/genshin-gacha-export/blob/main/UIGF_converter.py
 # https://github.com/sunfkny/genshin-gacha-export/blob/main/writeXLSX.py
 
+import os
+import csv
+import gzip
 import json
+import asyncio
 from time import time
+from uuid import uuid4
+from hashlib import md5
 from pathlib import Path
-from typing import Dict, List, Literal, Generator
+from shutil import copyfile
+from itertools import islice
+from operator import itemgetter
+from zipfile import ZIP_STORED, ZIP_DEFLATED, ZipFile
+from typing import (
+    Any,
+    Dict,
+    List,
+    Tuple,
+    Literal,
+    Callable,
+    Iterable,
+    Iterator,
+    Optional,
+    Awaitable,
+    Generator,
+)
 
 from nonebot.log import logger
 from xlsxwriter import Workbook
+from nonebot.utils import run_sync
 
-from .data_source import logsHelper
-from .__meta__ import LOCAL_DIR, GACHA_TYPE, GACHA_TYPE_FULL, datetime_with_tz
+from .gacha_analysis import calcPity
+from .data_source import logsHelper, configHelper
+from .worker_pool import WorkerPool, PoolBusyError, PoolDuplicateError
+from .__meta__ import (
+    LOCAL_DIR,
+    EXPORT_DIR,
+    GACHA_TYPE,
+    EXPORT_CACHE,
+    EXPORT_QUEUE,
+    EXPORT_WORKERS,
+    GACHA_TYPE_FULL,
+    datetime_with_tz,
+)
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+# 导出任务池，各格式文件写入均为同步操作，不应阻塞事件循环
+EXPORT_POOL = WorkerPool("导出", "thread", EXPORT_WORKERS, EXPORT_QUEUE)
+
+# 导出格式版本，导出内容变更时递增以弃用已缓存的导出文件
+EXPORT_VERSION = 2
+
+# 导出格式及名称，json.gz 为 gzip 压缩的 UIGF JSON
+ExportFormat = Literal["xlsx", "json", "json.gz", "csv", "parquet"]
+EXPORT_NAMES = {
+    "xlsx": "Excel",
+    "json": "JSON(UIGF)",
+    "json.gz": "JSON(UIGF, gzip)",
+    "csv": "CSV",
+    "parquet": "Parquet",
+}
+
+# UIGF 记录字段，原始数据页面及 CSV、Parquet 均按此顺序写入
+UIGF_FIELDS = [
+    "count",
+    "gacha_type",
+    "id",
+    "item_id",
+    "item_type",
+    "lang",
+    "name",
+    "rank_type",
+    "time",
+    "uid",
+    "uigf_gacha_type",
+]
+
+# Parquet 每批写入的记录数
+PARQUET_BATCH = 65536
+
+
+def exportPath(uid: str, outFormat: ExportFormat) -> Path:
+    """
+    生成待发送的导出文件路径
+
+    * ``param uid: str`` 抽卡记录所属 UID
+    * ``param outFormat: ExportFormat`` 导出格式
+    - ``return: Path`` 文件路径，以导出时间及随机后缀区分，同一秒内的多次导出互不覆盖
+    """  # noqa: E501
+
+    exportTime = datetime_with_tz().strftime("%Y%m%d%H%M%S")
+    prefix = "UIGF" if outFormat.startswith("json") else "Wish"
+    return LOCAL_DIR / f"{prefix}-{uid}-{exportTime}-{uuid4().hex[:8]}.{outFormat}"
+
+
+def hashLogsFile(file: Path) -> str:
+    """
+    抽卡记录缓存文件内容摘要，用于区分导出文件缓存
+
+    * ``param file: Path`` 抽卡记录缓存文件路径
+    - ``return: str`` MD5 摘要
+    """
+
+    digest = md5()
+    with open(file, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def linkExport(cachePath: Path, filePath: Path) -> bool:
+    """
+    从缓存取出导出文件，优先使用硬链接，不支持时复制文件，并刷新缓存的最近使用时间
+
+    * ``param cachePath: Path`` 缓存文件路径
+    * ``param filePath: Path`` 待发送的导出文件路径，发送后可直接删除
+    - ``return: bool`` 是否取出成功，缓存不存在或已被淘汰时返回 ``False``
+    """  # noqa: E501
+
+    try:
+        try:
+            os.link(cachePath, filePath)
+        except OSError:
+            copyfile(cachePath, filePath)
+        os.utime(cachePath)
+        return True
+    except OSError:
+        filePath.unlink(missing_ok=True)
+        return False
+
+
+def evictExports() -> None:
+    """按最近使用时间淘汰导出文件缓存，直至缓存总大小不超过 ``EXPORT_CACHE``"""
+
+    cached = []
+    for f in EXPORT_DIR.iterdir():
+        try:
+            stat = f.stat()
+            cached.append((stat.st_mtime, stat.st_size, f))
+        except OSError:
+            continue
+    total, limit = sum(size for _, size, _ in cached), EXPORT_CACHE * 1024 * 1024
+    for _, size, f in sorted(cached):
+        if total <= limit:
+            break
+        f.unlink(missing_ok=True)
+        total -= size
+        logger.debug(f"导出文件缓存 {f.name} 已淘汰")
 
 
 def gnrtId() -> Generator[str, None, None]:
@@ -23,100 +166,196 @@ def gnrtId() -> Generator[str, None, None]:
         yield str(id)
 
 
-async def transUIGF(uid: str, gachaLogs: Dict) -> Dict:
+def iterUIGF(gachaLogs: Dict) -> Iterator[Dict]:
     """
-    转换原始请求结果为 UIGF JSON
+    按 ID 顺序逐条生成 UIGF 记录，记录在生成时才复制并补充字段，不修改原始数据
+
+    各卡池记录从新到旧排列，逆序拼接后即为若干段已按时间及 ID 升序的记录，
+    只需对记录序号排序，由 Timsort 识别各段并归并，无需反复排序及复制记录；
+    存在缺失 ID 的记录时，先按时间顺序依次补充 ID 再按 ID 排序
 
-    * ``param uid: str`` 抽卡记录所属 UID
     * ``param gachaLogs: dict`` 原始请求结果
-    - ``return: Dict`` UIGF 格式数据
-    """
-
-    uigf = {
-        "info": {
-            "uid": uid,
-            "lang": "zh-cn",
-            "uigf_version": "v2.3",
-            "export_timestamp": int(time()),
-            "export_time": datetime_with_tz().strftime("%Y-%m-%d %H:%M:%S"),
-            "export_app": "nonebot-plugin-gachalogs",
-            "export_app_version": "v0.2.12",
-        },
-        "list": [],
-    }
-    # 转换数据
+    - ``return: Iterator[Dict]`` UIGF 记录
+    """  # noqa: E501
+
+    items: List[Dict] = []
+    banners: List[str] = []
     for banner in GACHA_TYPE:
-        gachaLog = gachaLogs.get(banner, [])
-        gachaLog = sorted(gachaLog, key=lambda i: i["time"], reverse=True)
-        gachaLog.reverse()
-        for item in gachaLog:
-            item["uigf_gacha_type"] = banner
-        uigf["list"].extend(gachaLog)
-    uigf["list"] = sorted(uigf["list"], key=lambda i: i["time"])
-    # 缺失物品 ID 补充
-    id = gnrtId()
-    for item in uigf["list"]:
-        if not item.get("id"):
-            item["id"] = next(id)
-    uigf["list"] = sorted(uigf["list"], key=lambda i: i["id"])
-    # 返回 UIGF JSON
-    return uigf
-
-
-async def transXLSX(uid: str, gachaLogs: Dict, uigfList: List) -> Path:
-    """
-    转换原始请求结果为 UIGF XLSX
+        gachaList = gachaLogs.get(banner) or []
+        items.extend(reversed(gachaList))
+        banners.extend([banner] * len(gachaList))
+    ids = [item.get("id") for item in items]
+
+    if all(ids):
+        # 米哈游接口返回的记录 ID 与时间顺序一致，时间仅用于 ID 相同时保持原有顺序
+        keys = list(map(itemgetter("id", "time"), items))
+        order = sorted(range(len(items)), key=keys.__getitem__)
+    else:
+        # 缺失物品 ID 按时间顺序补充，相同时间的记录保持卡池顺序
+        times = list(map(itemgetter("time"), items))
+        order, id = sorted(range(len(items)), key=times.__getitem__), gnrtId()
+        for idx in order:
+            if not ids[idx]:
+                ids[idx] = next(id)
+        order.sort(key=ids.__getitem__)
+
+    for idx in order:
+        uigfItem = {**items[idx], "uigf_gacha_type": banners[idx]}
+        if not uigfItem.get("id"):
+            uigfItem["id"] = ids[idx]
+        yield uigfItem
+
+
+def uigfInfo(uid: str) -> Dict:
+    """
+    生成 UIGF JSON 的 ``info`` 字段
+
+    * ``param uid: str`` 抽卡记录所属 UID
+    - ``return: Dict`` UIGF 导出信息
+    """
+
+    return {
+        "uid": uid,
+        "lang": "zh-cn",
+        "uigf_version": "v2.3",
+        "export_timestamp": int(time()),
+        "export_time": datetime_with_tz().strftime("%Y-%m-%d %H:%M:%S"),
+        "export_app": "nonebot-plugin-gachalogs",
+        "export_app_version": "v0.2.12",
+    }
+
+
+def writeUIGF(
+    uid: str, gachaLogs: Dict, filePath: Path, compress: bool = False
+) -> Path:
+    """
+    逐条写入 UIGF JSON，内存占用不随记录数量增长
 
     * ``param uid: str`` 抽卡记录所属 UID
     * ``param gachaLogs: dict`` 原始请求结果
-    * ``param uigfList: list`` UIGF 格式数据，由 ``transUIGF()`` 生成
-    - ``return: Path`` XLSX 文件路径
+    * ``param filePath: Path`` 文件路径
+    * ``param compress: bool = False`` 是否以 gzip 压缩写入
+    - ``return: Path`` 文件路径
     """
 
-    exportTime = datetime_with_tz().strftime("%Y%m%d%H%M%S")
-    wbPath = LOCAL_DIR / f"Wish-{uid}-{exportTime}.xlsx"
-    wb = Workbook(wbPath)
+    # 紧凑格式输出，不影响其他工具按 UIGF 标准导入
+    encode = json.JSONEncoder(ensure_ascii=False, separators=(",", ":")).encode
+    with (
+        gzip.open(filePath, "wt", encoding="utf-8", compresslevel=6)
+        if compress
+        else open(filePath, "w", encoding="utf-8")
+    ) as f:
+        f.write(f'{{"info":{encode(uigfInfo(uid))},"list":[')
+        for idx, item in enumerate(iterUIGF(gachaLogs)):
+            f.write(f",{encode(item)}" if idx else encode(item))
+        f.write("]}")
+    return filePath
+
+
+def writeCSV(gachaLogs: Dict, filePath: Path) -> Path:
+    """
+    逐条写入 CSV，字段与 UIGF 记录一致，带有 BOM 以便表格软件识别编码
+
+    * ``param gachaLogs: dict`` 原始请求结果
+    * ``param filePath: Path`` 文件路径
+    - ``return: Path`` 文件路径
+    """
+
+    with open(filePath, "w", encoding="utf-8-sig", newline="") as f:
+        writer = csv.DictWriter(f, UIGF_FIELDS, restval="", extrasaction="ignore")
+        writer.writeheader()
+        writer.writerows(iterUIGF(gachaLogs))
+    return filePath
+
+
+def writeParquet(gachaLogs: Dict, filePath: Path) -> Path:
+    """
+    分批写入 Parquet，字段与 UIGF 记录一致，均为字符串类型，需要安装 pyarrow
+
+    * ``param gachaLogs: dict`` 原始请求结果
+    * ``param filePath: Path`` 文件路径
+    - ``return: Path`` 文件路径
+    """
+
+    if pa is None:
+        raise ModuleNotFoundError("导出 Parquet 需要安装 pyarrow")
+    schema = pa.schema([(k, pa.string()) for k in UIGF_FIELDS])
+    records = iterUIGF(gachaLogs)
+    with pq.ParquetWriter(filePath, schema) as writer:
+        while True:
+            batch = list(islice(records, PARQUET_BATCH))
+            if not batch:
+                break
+            columns = {
+                k: [str(item.get(k) or "") for item in batch] for k in UIGF_FIELDS
+            }
+            writer.write_table(pa.Table.from_pydict(columns, schema=schema))
+    return filePath
+
+
+def transXLSX(
+    gachaLogs: Dict,
+    uigfList: Iterable[Dict],
+    pity: Dict[str, Tuple[int, ...]],
+    wbPath: Path,
+) -> Path:
+    """
+    转换原始请求结果为 UIGF XLSX，以 ``constant_memory`` 模式逐行写入，内存占用不随记录数量增长
+
+    * ``param gachaLogs: dict`` 原始请求结果
+    * ``param uigfList: Iterable[Dict]`` UIGF 记录，由 ``iterUIGF()`` 生成
+    * ``param pity: Dict[str, Tuple[int, ...]]`` 各卡池每条记录的保底内抽数，由 ``calcPity()`` 生成
+    * ``param wbPath: Path`` XLSX 文件路径
+    - ``return: Path`` XLSX 文件路径
+    """  # noqa: E501
+
+    # 该模式下每个页面只能按行顺序写入，写完一行即刷新至临时文件
+    wb = Workbook(wbPath, {"constant_memory": True})
+    # 定义样式，整个工作簿共用
+    headerStyle = wb.add_format(
+        {
+            "align": "left",
+            "font_name": "微软雅黑",
+            "color": "#757575",
+            "bg_color": "#dbd7d3",
+            "border_color": "#c4c2bf",
+            "border": 1,
+            "bold": True,
+        }
+    )
+    contentStyle = wb.add_format(
+        {
+            "align": "left",
+            "font_name": "微软雅黑",
+            "border_color": "#c4c2bf",
+            "bg_color": "#ebebeb",
+            "border": 1,
+        }
+    )
+    # 三星、四星、五星物品高亮
+    rankStyle = [
+        wb.add_format({"color": "#8e8e8e"}),  # 3
+        wb.add_format({"color": "#a256e1", "bold": True}),  # 4
+        wb.add_format({"color": "#bd6932", "bold": True}),  # 5
+    ]
     # 重排顺序为 301 302 200 100（角色、武器、常驻、新手
     writeOrder = sorted(GACHA_TYPE.keys(), key=lambda t: t[0], reverse=True)
+    header = ["时间", "名称", "物品类型", "星级", "祈愿类型", "总次数", "保底内"]
     for banner in writeOrder:
         # 新建页面
         worksheet = wb.add_worksheet(GACHA_TYPE[banner])
-        # 定义样式
-        headerStyle = wb.add_format(
-            {
-                "align": "left",
-                "font_name": "微软雅黑",
-                "color": "#757575",
-                "bg_color": "#dbd7d3",
-                "border_color": "#c4c2bf",
-                "border": 1,
-                "bold": True,
-            }
-        )
-        contentStyle = wb.add_format(
-            {
-                "align": "left",
-                "font_name": "微软雅黑",
-                "border_color": "#c4c2bf",
-                "bg_color": "#ebebeb",
-                "border": 1,
-            }
-        )
         worksheet.set_column("A:A", 22)  # 时间
         worksheet.set_column("B:B", 14)  # 名称
         worksheet.set_column("E:E", 14)  # 祈愿类型
         # 写入表头
-        header = ["时间", "名称", "物品类型", "星级", "祈愿类型", "总次数", "保底内"]
         worksheet.write_row(0, 0, header, headerStyle)
         worksheet.freeze_panes(1, 0)
-        # 写入记录，从最旧的数据开始
-        counter = 0
-        pityCounter = 0
+        # 写入记录，从最旧的数据开始，保底内抽数取自分析结果
         gachaList = gachaLogs.get(banner, [])
-        gachaList.reverse()
-        for item in gachaList:
-            counter = counter + 1
-            pityCounter = pityCounter + 1
+        pitySeries = pity.get(banner, ())
+        for counter, (item, pityCounter) in enumerate(
+            zip(reversed(gachaList), pitySeries), 1
+        ):
             content = [
                 item["time"],
                 item["name"],
@@ -127,21 +366,13 @@ async def transXLSX(uid: str, gachaLogs: Dict, uigfList: List) -> Path:
                 pityCounter,
             ]
             worksheet.write_row(counter, 0, content, contentStyle)
-            if content[3] == 5:
-                pityCounter = 0
-        # 三星、四星、五星物品高亮
         row1st, rowLast = 1, len(gachaList)
         col1st, colLast = 0, len(header) - 1
-        rankStyle = [
-            {"color": "#8e8e8e"},  # 3
-            {"color": "#a256e1", "bold": True},  # 4
-            {"color": "#bd6932", "bold": True},  # 5
-        ]
         for styleId, style in enumerate(rankStyle):
             _format = {
                 "type": "formula",
                 "criteria": f"=$D2={styleId + 3}",
-                "format": wb.add_format(style),
+                "format": style,
             }
             worksheet.conditional_format(row1st, col1st, rowLast, colLast, _format)
     # 额外新建原始数据页面
@@ -153,73 +384,208 @@ async def transXLSX(uid: str, gachaLogs: Dict, uigfList: List) -> Path:
     worksheet.set_column("H:H", 14)  # rank_type
     worksheet.set_column("I:I", 22)  # time
     worksheet.set_column("J:J", 14)  # uid
-    rawHeader = [
-        "count",
-        "gacha_type",
-        "id",
-        "item_id",
-        "item_type",
-        "lang",
-        "name",
-        "rank_type",
-        "time",
-        "uid",
-        "uigf_gacha_type",
-    ]
-    worksheet.write_row(0, 0, rawHeader)
-    allCounter = 0
-    for item in uigfList:
-        rawContent = [
-            item.get("count", ""),
-            item.get("gacha_type", ""),
-            item.get("id", ""),
-            item.get("item_id", ""),
-            item.get("item_type", ""),
-            item.get("lang", ""),
-            item.get("name", ""),
-            item.get("rank_type", ""),
-            item.get("time", ""),
-            item.get("uid", ""),
-            item.get("uigf_gacha_type", ""),
-        ]
-        worksheet.write_row(allCounter + 1, 0, rawContent)
-        allCounter += 1
+    worksheet.write_row(0, 0, UIGF_FIELDS)
+    for allCounter, item in enumerate(uigfList, 1):
+        worksheet.write_row(allCounter, 0, [item.get(k, "") for k in UIGF_FIELDS])
     # 关闭工作簿
     wb.close()
     # 返回文件路径
     return wbPath
 
 
+def writeGachaFile(
+    uid: str,
+    gachaLogs: Dict,
+    outFormat: ExportFormat,
+    pity: Dict[str, Tuple[int, ...]],
+    cachePath: Optional[Path] = None,
+) -> Path:
+    """
+    生成抽卡数据文件，在导出任务池中执行
+
+    * ``param uid: str`` 抽卡记录所属 UID
+    * ``param gachaLogs: Dict`` 抽卡记录数据
+    * ``param outFormat: ExportFormat`` 导出格式
+    * ``param pity: Dict[str, Tuple[int, ...]]`` 各卡池每条记录的保底内抽数，仅导出 XLSX 时使用
+    * ``param cachePath: Optional[Path] = None`` 缓存文件路径，传入时生成的文件移入缓存并以硬链接发送
+    - ``return: Path`` 文件路径
+    """  # noqa: E501
+
+    # 先写入本次导出独有的暂存文件，写入完成后再移入缓存或作为待发送文件
+    filePath = exportPath(uid, outFormat)
+    tempPath = filePath.with_name(f".{filePath.name}.tmp")
+    try:
+        # 转换原始数据为 UIGF 格式数据并逐条写入
+        if outFormat == "xlsx":
+            transXLSX(gachaLogs, iterUIGF(gachaLogs), pity, tempPath)
+        elif outFormat == "csv":
+            writeCSV(gachaLogs, tempPath)
+        elif outFormat == "parquet":
+            writeParquet(gachaLogs, tempPath)
+        else:
+            writeUIGF(uid, gachaLogs, tempPath, outFormat == "json.gz")
+        if cachePath is None:
+            os.replace(tempPath, filePath)
+            return filePath
+        # 移入缓存后为本次导出建立独立的硬链接，其他请求删除自己的文件不受影响
+        os.replace(tempPath, cachePath)
+    finally:
+        tempPath.unlink(missing_ok=True)
+    if not linkExport(cachePath, filePath):
+        raise FileNotFoundError(f"导出文件缓存 {cachePath.name} 不存在")
+    evictExports()
+    return filePath
+
+
+async def prepareGachaFile(
+    logs: str,
+    outFormat: ExportFormat,
+    onQueued: Optional[Callable[[int], Awaitable[Any]]] = None,
+    cache: bool = True,
+) -> Path:
+    """
+    读取抽卡记录并取出或生成导出文件，记录未变更时直接使用缓存的导出文件
+
+    * ``param logs: str`` 抽卡记录缓存文件路径
+    * ``param outFormat: ExportFormat`` 导出格式
+    * ``param onQueued: Optional[Callable[[int], Awaitable[Any]]] = None`` 导出任务需要排队时以排队位次调用
+    * ``param cache: bool = True`` 是否使用导出文件缓存，批量导出时不使用，以免淘汰用户导出的缓存
+    - ``return: Path`` 待发送的导出文件路径，排队已满时由任务池抛出 ``PoolBusyError``
+    """  # noqa: E501
+
+    # 读取抽卡记录缓存
+    uid, gachaLogs = await logsHelper(logs)
+    if not uid.isdigit():
+        raise ValueError(uid)
+    # 导出文件缓存以 UID、导出格式、记录内容摘要及导出格式版本区分
+    cachePath, filePath = None, exportPath(uid, outFormat)
+    if cache and EXPORT_CACHE > 0:
+        digest = await run_sync(hashLogsFile)(Path(logs))
+        cachePath = (
+            EXPORT_DIR / f"gachalogs-{uid}-{digest}-v{EXPORT_VERSION}.{outFormat}"
+        )
+    if cachePath and await run_sync(linkExport)(cachePath, filePath):
+        logger.debug(f"UID{uid} 的抽卡记录未变更，使用缓存的导出文件")
+        return filePath
+    pity = (await run_sync(calcPity)(gachaLogs)) if outFormat == "xlsx" else {}
+    # 需要排队时提示排队位次
+    position = EXPORT_POOL.position
+    if onQueued is not None and 0 < position <= EXPORT_POOL.queue:
+        await onQueued(position)
+    # 生成对应格式文件
+    return await EXPORT_POOL.run(
+        writeGachaFile, uid, gachaLogs, outFormat, pity, cachePath
+    )
+
+
 # 导出抽卡数据
-async def gnrtGachaFile(config: Dict, outFormat: Literal["xlsx", "json"]) -> Dict:
+async def gnrtGachaFile(
+    config: Dict,
+    outFormat: ExportFormat,
+    user: str = "",
+    onQueued: Optional[Callable[[int], Awaitable[Any]]] = None,
+) -> Dict:
     """
-    导出抽卡数据
+    导出抽卡数据，文件在导出任务池中生成，同一用户同时只能有一个导出任务，记录未变更时直接使用缓存的导出文件
 
     * ``param config: Dict`` 配置文件
-    * ``param outFormat: Literal["xlsx", "json"]`` 导出格式
+    * ``param outFormat: ExportFormat`` 导出格式
+    * ``param user: str = ""`` 发起导出的用户，默认以抽卡记录缓存文件区分
+    * ``param onQueued: Optional[Callable[[int], Awaitable[Any]]] = None`` 导出任务需要排队时以排队位次调用
     - ``return: Dict`` 导出结果，出错时返回 ``{"error": "错误信息"}``
-    """
+    """  # noqa: E501
 
     # 无抽卡记录数据直接返回
     if not config.get("logs"):
         return {"error": "没有抽卡记录可供导出哦！"}
-    # 读取抽卡记录缓存
-    uid, gachaLogs = await logsHelper(config["logs"])
-    if not uid.isdigit():
-        return {"error": uid}
-    # 转换原始数据为 UIGF 格式数据
-    uigfData = await transUIGF(uid, gachaLogs)
-    # 生成对应格式文件
+    if outFormat == "parquet" and pa is None:
+        return {"error": "Bot 未安装 pyarrow，暂时无法导出 Parquet 哦！"}
     try:
-        if outFormat == "xlsx":
-            xlsxPath = await transXLSX(uid, gachaLogs, uigfData["list"])
-            return {"msg": "导出抽卡记录 Excel 完成！", "path": xlsxPath}
-        elif outFormat == "json":
-            exportTime = datetime_with_tz().strftime("%Y%m%d%H%M%S")
-            uigfPath = LOCAL_DIR / f"UIGF-{uid}-{exportTime}.json"
-            with open(uigfPath, "w", encoding="utf-8") as f:
-                json.dump(uigfData, f, ensure_ascii=False, indent=2)
-            return {"msg": "导出抽卡记录 JSON(UIGF) 完成！", "path": uigfPath}
+        with EXPORT_POOL.occupy(user or str(config["logs"])):
+            filePath = await prepareGachaFile(config["logs"], outFormat, onQueued)
+        return {"msg": f"导出抽卡记录 {EXPORT_NAMES[outFormat]} 完成！", "path": filePath}
+    except PoolDuplicateError:
+        return {"error": "上一个导出任务还没有完成，请稍后再试！"}
+    except PoolBusyError:
+        return {"error": "当前导出任务较多，请稍后再试！"}
     except Exception as e:
         logger.opt(exception=e).error("导出抽卡记录失败")
         return {"error": f"因为 {e.__class__.__name__} 导出失败了.."}
+
+
+def packFile(zf: ZipFile, filePath: Path) -> None:
+    """
+    将导出文件写入打包文件后删除，已压缩的格式仅存储不再压缩
+
+    * ``param zf: ZipFile`` 打包文件
+    * ``param filePath: Path`` 导出文件路径
+    """
+
+    stored = filePath.suffix in [".xlsx", ".gz", ".parquet"]
+    try:
+        zf.write(filePath, filePath.name, ZIP_STORED if stored else ZIP_DEFLATED)
+    finally:
+        filePath.unlink(missing_ok=True)
+
+
+async def gnrtBackupZip(
+    outFormat: ExportFormat,
+    onProgress: Optional[Callable[[int, int], Awaitable[Any]]] = None,
+) -> Dict:
+    """
+    打包导出全部用户的抽卡数据，各用户文件在导出任务池中并行生成，生成一个即写入一个
+
+    * ``param outFormat: ExportFormat`` 导出格式
+    * ``param onProgress: Optional[Callable[[int, int], Awaitable[Any]]] = None`` 每完成一个用户时以已完成数、总数调用
+    - ``return: Dict`` 打包结果，出错时返回 ``{"error": "错误信息"}``
+    """  # noqa: E501
+
+    if outFormat == "parquet" and pa is None:
+        return {"error": "Bot 未安装 pyarrow，暂时无法导出 Parquet 哦！"}
+    # 多个 QQ 可能绑定同一 UID，按抽卡记录缓存文件去重
+    cfg = await configHelper("0")
+    logsList = sorted({str(c["logs"]) for c in cfg.values() if c.get("logs")})
+    if not logsList:
+        return {"error": "没有抽卡记录可供打包哦！"}
+    # 打包任务最多同时占用全部导出线程，排队已满时等待空闲，优先处理用户的导出任务
+    slots, stopped = asyncio.Semaphore(EXPORT_POOL.workers), asyncio.Event()
+
+    async def export(logs: str) -> Optional[Path]:
+        async with slots:
+            while not stopped.is_set():
+                try:
+                    return await prepareGachaFile(logs, outFormat, cache=False)
+                except PoolBusyError:
+                    await asyncio.sleep(1)
+        return None
+
+    zipPath = LOCAL_DIR / f"Backup-{datetime_with_tz().strftime('%Y%m%d%H%M%S')}.zip"
+    done, failed, tasks = 0, [], []
+    try:
+        with EXPORT_POOL.occupy("backup"), ZipFile(zipPath, "w") as zf:
+            tasks = [asyncio.ensure_future(export(logs)) for logs in logsList]
+            for task in asyncio.as_completed(tasks):
+                try:
+                    await run_sync(packFile)(zf, await task)
+                except Exception as e:
+                    logger.opt(exception=e).error("打包导出抽卡记录时出错")
+                    failed.append(e.__class__.__name__)
+                done += 1
+                if onProgress is not None:
+                    await onProgress(done, len(logsList))
+    except PoolDuplicateError:
+        return {"error": "上一个打包任务还没有完成，请稍后再试！"}
+    except Exception as e:
+        logger.opt(exception=e).error("打包导出抽卡记录失败")
+        zipPath.unlink(missing_ok=True)
+        return {"error": f"因为 {e.__class__.__name__} 打包失败了.."}
+    finally:
+        # 打包中止时不再开始新的导出，等待已开始的导出完成后删除未写入打包文件的导出文件
+        stopped.set()
+        for result in await asyncio.gather(*tasks, return_exceptions=True):
+            if isinstance(result, Path):
+                result.unlink(missing_ok=True)
+    msg = f"打包导出 {done - len(failed)} 份抽卡记录 {EXPORT_NAMES[outFormat]} 完成！"
+    if failed:
+        msg += f"另有 {len(failed)} 份导出失败，详见日志。"
+    return {"msg": msg, "path": zipPath}
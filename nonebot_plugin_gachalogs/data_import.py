@@ -1,77 +1,310 @@
+import re
 import json
+import asyncio
+from heapq import merge
 from pathlib import Path
-from datetime import datetime, timedelta
-from typing import Any, Set, Dict, List, Tuple, Union, Literal, Optional
+from datetime import date
+from functools import lru_cache
+from operator import itemgetter
+from codecs import getincrementaldecoder
+from typing import Any, Set, Dict, List, Tuple, Union, Literal, Callable, Optional
 
 from nonebot.log import logger
 from nonebot.utils import run_sync
-from httpx import AsyncClient, NetworkError
+from httpx import AsyncClient, TransportError
 
 from .data_render import gnrtGachaInfo
+from .worker_pool import PoolBusyError
 from .data_source import logsHelper, configHelper
-from .__meta__ import LOCAL_DIR, GACHA_TYPE, datetime_with_tz
+from .__meta__ import (
+    LOCAL_DIR,
+    GACHA_TYPE,
+    IMPORT_SIZE,
+    IMPORT_TIMEOUT,
+    datetime_with_tz,
+    timestamp_with_tz,
+)
+
+# 导入记录必需字段
+STANDARD_KEYS = [
+    # "uid",  # v2.2 非必需，但官方返回
+    "gacha_type",
+    # "item_id",  # v2.2 非必需，但官方返回
+    # "count",  # v2.2 非必需，但官方返回
+    "time",  # v2.2 非必需，但插件必需
+    "name",
+    # "lang",  # v2.2 非必需，但官方返回
+    "item_type",
+    "rank_type",  # v2.2 非必需，但插件必需
+    "id",
+]
+UIGF_KEYS = STANDARD_KEYS + ["uigf_gacha_type"]
+# 各格式记录必需字段，内部格式记录必须带有 UID
+RECORD_KEYS = {"inner": ["uid"] + STANDARD_KEYS, "uigf": UIGF_KEYS}
+# 记录时间格式，符合格式的时间可直接按字符串比较先后
+TIME_PATTERN = re.compile(
+    r"[0-9]{4}-(0[1-9]|1[0-2])-(0[1-9]|[12][0-9]|3[01])"
+    r" ([01][0-9]|2[0-3]):[0-5][0-9]:[0-5][0-9]"
+)
+
+
+@lru_cache(maxsize=4096)
+def validDate(day: str) -> bool:
+    """检查 ``"%Y-%m-%d"`` 格式的日期是否真实存在，同一天的记录只需检查一次"""
 
+    try:
+        date.fromisoformat(day)
+        return True
+    except ValueError:
+        return False
 
-@run_sync
-def analysisData(data: Dict[str, Any]) -> Tuple[int, str, Literal["inner", "uigf"]]:
+
+# 导入文件验证时最多报告的异常记录数。发现异常记录后只检查完已接收的数据即中止下载
+IMPORT_ERRORS = 5
+
+# 导入文件每次读取的字节数
+IMPORT_CHUNK = 64 * 1024
+
+
+class GachaFileError(ValueError):
     """
-    分析导入数据
+    导入文件中存在异常记录
+
+    * ``param errors: List[str]`` 异常记录说明
+    * ``param partial: bool = False`` 是否未检查全部记录即中止，此时可能还有更多异常记录
+    """  # noqa: E501
+
+    def __init__(self, errors: List[str], partial: bool = False) -> None:
+        super().__init__("\n".join(errors))
+        self.errors = errors
+        self.partial = partial
+
+
+def compileChecker(
+    format: Literal["inner", "uigf"]
+) -> Callable[[Any, str], Optional[str]]:
+    """
+    生成单条记录的验证函数，一次遍历同时检查字段是否齐全及类型，合法记录仅做一次判断
+
+    * ``param format: Literal["inner", "uigf"]`` 导入数据格式
+    - ``return: Callable[[Any, str], Optional[str]]`` 验证函数，传入记录及已确定的 UID（尚未确定时为空），记录合法时无返回，否则返回异常原因
+    """  # noqa: E501
+
+    keys = RECORD_KEYS[format]
+    required, matchTime = frozenset(keys), TIME_PATTERN.fullmatch
+    uidRequired = format == "inner"
+
+    def diagnose(log: Any, uid: str) -> str:
+        if not isinstance(log, dict):
+            return "记录不是 JSON 对象"
+        reasons = []
+        missing = [k for k in keys if k not in log]
+        if missing:
+            reasons.append(f"缺少字段 {', '.join(missing)}")
+        wrongType = [k for k, v in log.items() if type(v) is not str]
+        if wrongType:
+            reasons.append(f"字段 {', '.join(wrongType)} 不是字符串")
+        if not reasons:
+            if not log["id"].isdigit():
+                reasons.append(f"id {log['id']} 不是数字")
+            if not (matchTime(log["time"]) and validDate(log["time"][:10])):
+                reasons.append(f"time {log['time']} 格式错误")
+            if "uid" in log and not log["uid"].isdigit():
+                reasons.append(f"uid {log['uid']} 不是数字")
+            elif "uid" in log and log["uid"] != uid:
+                reasons.append(f"uid {log['uid']} 与其他记录的 UID{uid} 不一致")
+        return "；".join(reasons) or "记录格式异常"
+
+    def check(log: Any, uid: str) -> Optional[str]:
+        if type(log) is dict and required <= log.keys():
+            for value in log.values():
+                if type(value) is not str:
+                    break
+            else:
+                # UID 尚未确定时说明此前没有合法 UID，带有 UID 的记录均不合法
+                if (
+                    log["id"].isdigit()
+                    and matchTime(log["time"])
+                    and validDate(log["time"][:10])
+                    and (
+                        log["uid"] == uid != ""
+                        if uidRequired
+                        else log.get("uid", uid) == uid and (uid or "uid" not in log)
+                    )
+                ):
+                    return None
+        return diagnose(log, uid)
+
+    return check
+
+
+# 各格式记录的验证函数
+RECORD_CHECKERS = {"inner": compileChecker("inner"), "uigf": compileChecker("uigf")}
 
-    * ``param data: Dict[str, Any]`` 导入数据，由 ``getFileData()`` 返回
-    - ``return: Tuple[int, str, Literal["inner", "uigf"]]`` 最新抽卡记录时间戳、抽卡记录归属 UID、导入数据格式
+
+class GachaFileParser:
     """
+    增量解析导入的抽卡记录 JSON 文件，边接收边逐条解析、验证数组中的记录，不保留已解析的原始文本
+
+    仅拆分顶层对象及其中的数组，其余值整体解析。内部格式以卡池为键、记录数组为值，
+    UIGF 格式以 ``info`` 为导出信息、``list`` 为记录数组
+    """  # noqa: E501
 
-    timestamp, uid, format = 0.0, "", ""
-    standardKeys = [
-        # "uid",  # v2.2 非必需，但官方返回
-        "gacha_type",
-        # "item_id",  # v2.2 非必需，但官方返回
-        # "count",  # v2.2 非必需，但官方返回
-        "time",  # v2.2 非必需，但插件必需
-        "name",
-        # "lang",  # v2.2 非必需，但官方返回
-        "item_type",
-        "rank_type",  # v2.2 非必需，但插件必需
-        "id",
-    ]
-
-    # 内部格式验证
-    if all(k.isdigit() for k in data.keys()):
-        format = "inner"
-        for k in data.keys():
-            assert isinstance(data[k], list)
-            for log in data[k]:
-                assert isinstance(log, dict) and all(
-                    isinstance(k, str) and isinstance(v, str) for k, v in log.items()
+    def __init__(self) -> None:
+        self.data: Dict[str, Any] = {}
+        self._decoder = json.JSONDecoder()
+        self._buffer, self._state, self._key = "", "start", ""
+        self.errors: List[str] = []
+        self._uid = {"inner": "", "uigf": ""}
+        self._maxTime = {"inner": "", "uigf": ""}
+
+    def _checkRecord(self, key: str, log: Any, index: int) -> None:
+        """
+        验证单条记录并记录最新时间，内部格式记录的 UID 必须一致，UIGF 格式记录的 UID 在解析结束时与导出信息核对
+
+        * ``param key: str`` 记录所在数组的键
+        * ``param log: Any`` 记录
+        * ``param index: int`` 记录在数组中的序号，用于报告异常记录
+        """  # noqa: E501
+
+        format: Literal["inner", "uigf"] = "inner" if key.isdigit() else "uigf"
+        uid = self._uid[format]
+        # 以第一条带有合法 UID 的记录确定 UID
+        if not uid and isinstance(log, dict):
+            maybeUid = log.get("uid")
+            if isinstance(maybeUid, str) and maybeUid.isdigit():
+                uid = self._uid[format] = maybeUid
+        error = RECORD_CHECKERS[format](log, uid)
+        if error:
+            self.errors.append(f"{key}[{index}]：{error}")
+            if len(self.errors) >= IMPORT_ERRORS:
+                raise GachaFileError(self.errors, True)
+        elif log["time"] > self._maxTime[format]:
+            self._maxTime[format] = log["time"]
+
+    def _decode(self, buffer: str, pos: int, final: bool) -> Optional[Tuple[Any, int]]:
+        """解析一个完整的值，数据不完整时返回 ``None`` 等待后续数据"""
+
+        try:
+            value, end = self._decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            if final:
+                raise
+            return None
+        # 数字之后只剩数字字符时可能被截断，如 "890." 之后还有 "5"，需等待后续数据确认
+        if (
+            not final
+            and isinstance(value, (int, float))
+            and not buffer[end:].strip("0123456789.eE+-")
+        ):
+            return None
+        return value, end
+
+    def feed(self, text: str, final: bool = False) -> None:
+        """
+        解析新接收的文本
+
+        * ``param text: str`` 新接收的文本
+        * ``param final: bool = False`` 是否已接收完毕
+        """
+
+        buffer, pos = self._buffer + text, 0
+        while True:
+            while pos < len(buffer) and buffer[pos] in " \t\n\r":
+                pos += 1
+            if pos >= len(buffer):
+                break
+            char, state = buffer[pos], self._state
+            if state == "start":
+                if char != "{":
+                    raise json.JSONDecodeError("Expecting '{'", buffer, pos)
+                pos, self._state = pos + 1, "firstKey"
+            elif state in ["firstKey", "key"]:
+                if state == "firstKey" and char == "}":
+                    pos, self._state = pos + 1, "end"
+                    continue
+                if char != '"':
+                    raise json.JSONDecodeError("Expecting property name", buffer, pos)
+                decoded = self._decode(buffer, pos, final)
+                if decoded is None:
+                    break
+                self._key, pos = decoded
+                self._state = "colon"
+            elif state == "colon":
+                if char != ":":
+                    raise json.JSONDecodeError("Expecting ':'", buffer, pos)
+                pos, self._state = pos + 1, "value"
+            elif state == "value":
+                if char == "[":
+                    self.data[self._key] = []
+                    pos, self._state = pos + 1, "firstItem"
+                    continue
+                decoded = self._decode(buffer, pos, final)
+                if decoded is None:
+                    break
+                self.data[self._key], pos = decoded
+                self._state = "afterValue"
+            elif state in ["firstItem", "item"]:
+                if state == "firstItem" and char == "]":
+                    pos, self._state = pos + 1, "afterValue"
+                    continue
+                decoded = self._decode(buffer, pos, final)
+                if decoded is None:
+                    break
+                log, pos = decoded
+                if self._key.isdigit() or self._key == "list":
+                    self._checkRecord(self._key, log, len(self.data[self._key]))
+                self.data[self._key].append(log)
+                self._state = "afterItem"
+            elif state == "afterItem":
+                if char not in ",]":
+                    raise json.JSONDecodeError("Expecting ',' delimiter", buffer, pos)
+                pos, self._state = pos + 1, ("item" if char == "," else "afterValue")
+            elif state == "afterValue":
+                if char not in ",}":
+                    raise json.JSONDecodeError("Expecting ',' delimiter", buffer, pos)
+                pos, self._state = pos + 1, ("key" if char == "," else "end")
+            else:
+                raise json.JSONDecodeError("Extra data", buffer, pos)
+        self._buffer = buffer[pos:]
+        # 已接收的数据中存在异常记录时立即中止，不再继续接收
+        if self.errors and not final:
+            raise GachaFileError(self.errors, True)
+        if final and self._state != "end":
+            raise json.JSONDecodeError("Unexpected end of data", buffer, pos)
+
+    def close(self) -> Tuple[int, str, Literal["inner", "uigf"]]:
+        """
+        结束解析并分析导入数据
+
+        - ``return: Tuple[int, str, Literal["inner", "uigf"]]`` 最新抽卡记录时间戳、抽卡记录归属 UID、导入数据格式
+        """  # noqa: E501
+
+        data = self.data
+        if self.errors:
+            raise GachaFileError(self.errors)
+        # 内部格式验证
+        if data and all(k.isdigit() for k in data.keys()):
+            format = "inner"
+            assert all(isinstance(v, list) for v in data.values())
+            uid = self._uid[format]
+        # UIGF 格式验证
+        elif data.get("info") and data.get("list"):
+            format, uid = "uigf", data["info"]["uid"]
+            assert uid and uid.isdigit()
+            assert isinstance(data["list"], list)
+            if self._uid[format] not in ["", uid]:
+                raise GachaFileError(
+                    [f"list 中记录的 UID{self._uid[format]} 与 info 的 UID{uid} 不一致"]
                 )
-                assert all(k in log.keys() for k in standardKeys)
-                uid = uid or log["uid"]
-                assert uid and uid.isdigit() and log["uid"] == uid
-                assert log["id"].isdigit()
-                _timestamp = datetime_with_tz(log["time"]).timestamp()
-                timestamp = max(timestamp, _timestamp)
-    # UIGF 格式验证
-    elif data.get("info") and data.get("list"):
-        uid, format = data["info"]["uid"], "uigf"
-        standardKeys.append("uigf_gacha_type")
-        assert uid and uid.isdigit()
-        assert isinstance(data["list"], list)
-        for log in data["list"]:
-            assert isinstance(log, dict) and all(
-                isinstance(k, str) and isinstance(v, str) for k, v in log.items()
-            )
-            assert all(k in log.keys() for k in standardKeys)
-            assert log.get("uid", uid) == uid
-            assert log["id"].isdigit()
-            _timestamp = datetime_with_tz(log["time"]).timestamp()
-            timestamp = max(timestamp, _timestamp)
-    else:
-        raise ValueError("抽卡记录导入文件格式错误！")
+        else:
+            raise ValueError("抽卡记录导入文件格式错误！")
 
-    if uid[0] not in ["1", "2", "5"]:
-        raise ValueError(f"抽卡记录拥有者 UID{uid} 所属服务器暂未支持")
+        if uid[0] not in ["1", "2", "5"]:
+            raise ValueError(f"抽卡记录拥有者 UID{uid} 所属服务器暂未支持")
 
-    return int(timestamp), uid, format
+        maxTime = self._maxTime[format]
+        return int(timestamp_with_tz(maxTime) if maxTime else 0), uid, format
 
 
 @run_sync
@@ -95,15 +328,15 @@ def validateData(data: Dict[str, List[Dict]]) -> Optional[str]:
         if len(logs) == 10:
             verified[logsTime] = "used"
             continue
-        thisSecond = datetime.strptime(logsTime, timeFmt)
+        thisSecond = timestamp_with_tz(logsTime)
         # 当前列表与后一秒的列表组成完整十连
-        nextKey = (thisSecond + timedelta(seconds=1)).strftime(timeFmt)
+        nextKey = datetime_with_tz(thisSecond + 1).strftime(timeFmt)
         if data.get(nextKey) and (len(data[nextKey] + logs) == 10):
             verified[logsTime] = "used"
             verified[nextKey] = "used"
             continue
         # 当前列表与前一秒的列表组成完整十连，前一秒的列表不可被重复使用
-        lastKey = (thisSecond - timedelta(seconds=1)).strftime(timeFmt)
+        lastKey = datetime_with_tz(thisSecond - 1).strftime(timeFmt)
         if verified.get(lastKey, "null") == "" and (len(data[lastKey] + logs) == 10):
             verified[logsTime] = "used"
             verified[lastKey] = "used"
@@ -117,18 +350,57 @@ def validateData(data: Dict[str, List[Dict]]) -> Optional[str]:
 
 
 async def getFileData(url: str) -> Dict:
-    """获取链接对应文件的 JSON 数据"""
+    """
+    流式下载并增量解析导入文件，超出大小上限或超时立即中止
 
-    async with AsyncClient() as client:
-        try:
-            res = await client.get(url, timeout=10.0)
-            return res.json()
-        except NetworkError as e:
-            logger.opt(exception=e).error(f"记录导入文件下载出错 {url}")
-            return {"error": f"[{e.__class__.__name__}] 可能由于网络问题未能获取文件"}
-        except json.JSONDecodeError as e:
-            logger.opt(exception=e).error(f"记录导入文件解析出错 {url}")
-            return {"error": f"[{e.__class__.__name__}] 可能由于文件不是合法的 JSON"}
+    * ``param url: str`` 导入文件链接
+    - ``return: Dict`` 导入数据及分析结果，``{"data": Dict, "timestamp": int, "uid": str, "format": str}``，出错时返回 ``{"error": "错误信息"}``
+    """  # noqa: E501
+
+    parser, limit = GachaFileParser(), IMPORT_SIZE * 1024 * 1024
+    decoder = getincrementaldecoder("utf-8-sig")()
+
+    async def download() -> Optional[str]:
+        size = 0
+        async with AsyncClient() as client:
+            async with client.stream("GET", url, timeout=10.0) as res:
+                if int(res.headers.get("Content-Length") or 0) > limit:
+                    return f"文件超过 {IMPORT_SIZE}MB 导入上限"
+                async for chunk in res.aiter_bytes(IMPORT_CHUNK):
+                    size += len(chunk)
+                    if size > limit:
+                        return f"文件超过 {IMPORT_SIZE}MB 导入上限"
+                    await run_sync(parser.feed)(decoder.decode(chunk))
+        await run_sync(parser.feed)(decoder.decode(b"", final=True), True)
+
+    try:
+        error = await asyncio.wait_for(download(), IMPORT_TIMEOUT)
+        if error:
+            logger.error(f"记录导入文件下载中止 {url}：{error}")
+            return {"error": f"{error}，拒绝导入！"}
+        timestamp, uid, format = parser.close()
+        return {
+            "data": parser.data,
+            "timestamp": timestamp,
+            "uid": uid,
+            "format": format,
+        }
+    except asyncio.TimeoutError:
+        logger.error(f"记录导入文件下载超时 {url}")
+        return {"error": f"文件未能在 {IMPORT_TIMEOUT:g} 秒内下载完成，拒绝导入！"}
+    except TransportError as e:
+        logger.opt(exception=e).error(f"记录导入文件下载出错 {url}")
+        return {"error": f"[{e.__class__.__name__}] 可能由于网络问题未能获取文件"}
+    except (json.JSONDecodeError, UnicodeDecodeError) as e:
+        logger.opt(exception=e).error(f"记录导入文件解析出错 {url}")
+        return {"error": f"[{e.__class__.__name__}] 可能由于文件不是合法的 JSON"}
+    except GachaFileError as e:
+        logger.error(f"导入的抽卡记录文件存在异常记录 {url}\n{e}")
+        more = "等" if e.partial else ""
+        return {"error": f"导入的抽卡记录文件存在异常记录{more}：\n{e}"}
+    except (AssertionError, AttributeError, KeyError, TypeError, ValueError) as e:
+        logger.opt(exception=e).error("导入的抽卡记录文件格式异常")
+        return {"error": "导入的抽卡记录文件格式异常，请查看后台报错！"}
 
 
 async def getImportTarget(
@@ -249,12 +521,11 @@ async def mergeLogs(
     * ``param timestamp: int`` 抽卡数据时间戳
     - ``return: Tuple[Dict[str, list], Dict[str, str]]`` 内部格式抽卡数据、导入结果（``{"error": "", "msg": ""}``）
     """  # noqa: E501
-    # TODO: 优化
-    # 当前写的比较臃肿，主要基于以下思路：
+    # 合并主要基于以下思路：
     # 1. 导入和本地所有 id 非官方生成的都不可信任
-    # 2. 无论本地记录还是要导入的 UIGF 格式数据，
-    #    某时刻的数据只能是单抽或完整的十连
-    # 3. 导入后按时间顺序将记录分别插入卡池单独的列表中
+    # 2. 记录 id 均可信时以官方 id 判断记录是否已存在；否则由于某时刻的数据只能是单抽或完整的十连，
+    #    以时刻判断记录是否已存在
+    # 3. 本地记录各卡池已按时间排列，只需将新增记录按时间归并至各卡池
     # 4. 合并过程中所有记录的顺序均保证新数据在前，旧数据在后
 
     # UIGF 格式数据转换为中间态
@@ -284,42 +555,52 @@ async def mergeLogs(
     if illegal:
         return {}, {"error": f"UIGF 文件中 {illegal} 时既非单抽也非十连，拒绝导入异常数据！"}
 
-    # 内部格式数据转换为中间态
-    _, _local = (await logsHelper(config["logs"])) if config["logs"] else ("", {})
-    localDict = {}
-    for _, logs in _local.items():
+    # 本地记录均为验证通过的 UIGF 或 API 官方返回，各卡池已按时间从新到旧排列，无需重新排序
+    _, local = (await logsHelper(config["logs"])) if config["logs"] else ("", {})
+    # 可信的官方 id 集合，及全部记录、含不可信 id 记录的时刻集合
+    localIds, localTimes, untrustedTimes = set(), set(), set()
+    for logs in local.values():
         for log in logs:
-            # 所有由程序补全的 ID 均不信任
-            if str(log["id"]).startswith("1000"):
-                log["id"] = ""
-            # 内部格式数据分离为单抽和十连
-            if log["time"] in localDict:
-                localDict[log["time"]].append(log)
+            localTimes.add(log["time"])
+            if not log["id"] or str(log["id"]).startswith("1000"):
+                untrustedTimes.add(log["time"])
             else:
-                localDict[log["time"]] = [log]
-    # 内部格式数据均为验证通过的 UIGF 或 API 官方返回，跳过验证
+                localIds.add(log["id"])
 
-    # 合并中间态
-    counters = {}
+    # 本地记录中不存在的 id 或时刻视为新增，新增记录按卡池分组
+    counters, added = {}, {}
     for logsTime, logs in uigfDict.items():
         banner = "301" if logs[0]["gacha_type"] == "400" else logs[0]["gacha_type"]
-        if logsTime not in localDict:
-            localDict[logsTime] = logs
+        # 导入记录及本地同一时刻的记录 id 均可信时按 id 判断，否则按时刻判断
+        if logsTime not in untrustedTimes and all(log["id"] for log in logs):
+            isNew = not any(log["id"] in localIds for log in logs)
+        else:
+            isNew = logsTime not in localTimes
+        if isNew:
+            added.setdefault(banner, []).append(logs)
             counters[banner] = counters.get(banner, 0) + len(logs)
 
-    # 中间态转换为内部格式数据
-    merged = {}
-    localDict = dict(
-        sorted(
-            localDict.items(),
-            key=lambda x: datetime_with_tz(x[0]),
-            reverse=True,
-        )
-    )
-    for logsTime, logs in localDict.items():
-        banner = "301" if logs[0]["gacha_type"] == "400" else logs[0]["gacha_type"]
-        merged[banner] = merged.get(banner, [])
-        merged[banner].extend(logs)
+    # 各卡池本地记录与新增记录按时间归并，同一时刻的记录只来自其中之一
+    merged, getTime = {}, itemgetter("time")
+    for banner in [*local, *(b for b in added if b not in local)]:
+        # 所有由程序补全的 ID 均不信任，复制记录后清空，不修改读取的数据
+        localList = [
+            {**log, "id": ""} if str(log["id"]).startswith("1000") else log
+            for log in local.get(banner, [])
+        ]
+        if banner not in added:
+            bannerList = localList
+        else:
+            # 仅对新增记录按时间排序，本地记录保持原有顺序
+            addedGroups = sorted(
+                added[banner], key=lambda g: g[0]["time"], reverse=True
+            )
+            addedList = [log for logs in addedGroups for log in logs]
+            bannerList = list(merge(localList, addedList, key=getTime, reverse=True))
+        if bannerList:
+            merged[banner] = bannerList
+    # 卡池按最新记录时间排列
+    merged = dict(sorted(merged.items(), key=lambda x: x[1][0]["time"], reverse=True))
 
     config["logs"] = config["logs"] or str(LOCAL_DIR / f"gachalogs-{uid}.json")
     config["time"] = timestamp
@@ -350,18 +631,13 @@ async def importGachaFile(
     - ``return: Dict[str, str]`` 导入结果，``{"error": "", "bak": "", "msg": "", "img": bytes}``
     """  # noqa: E501
 
-    # 获取导入文件数据
-    data = await getFileData(file["url"])
+    # 获取导入文件数据，下载时即逐条验证记录并分析
+    fileData = await getFileData(file["url"])
     # 文件数据获取出错返回错误消息
-    if data.get("error"):
-        return data
-
-    # 分析导入数据
-    try:
-        timestamp, uid, format = await analysisData(data)
-    except (AssertionError, AttributeError, KeyError, ValueError) as e:
-        logger.opt(exception=e).error("导入的抽卡记录文件格式异常")
-        return {"error": "导入的抽卡记录文件格式异常，请查看后台报错！"}
+    if fileData.get("error"):
+        return fileData
+    data, timestamp = fileData["data"], fileData["timestamp"]
+    uid, format = fileData["uid"], fileData["format"]
 
     # 决定导入的目标配置
     logsFile, targetQ, config = await getImportTarget(qq, uid, qq in superusers)
@@ -385,6 +661,9 @@ async def importGachaFile(
         logsData, actionRes = await mergeLogs(data, config, targetQ, uid, timestamp)
     result.update(actionRes)
     if logsData:
-        result["img"] = await gnrtGachaInfo(logsData, uid)
+        try:
+            result["img"] = await gnrtGachaInfo(logsData, uid)
+        except PoolBusyError:
+            result["msg"] = f"{result.get('msg', '')}\n当前绘图任务较多，暂不生成统计图片.."
 
     return result
@@ -1,27 +1,48 @@
+from time import time
 from io import BytesIO
 from math import floor
-from copy import deepcopy
-from datetime import datetime
-from typing import Dict, List, Tuple, Literal
+from uuid import uuid4
+from pathlib import Path
+from functools import lru_cache
+from threading import Lock, local
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Tuple, Literal, Optional
 
-import matplotlib.pyplot as plt
 from nonebot.log import logger
 from nonebot.utils import run_sync
+from matplotlib.figure import Figure
 from matplotlib import font_manager as fm
 from PIL import Image, ImageDraw, ImageFont
+from nonebot.adapters.onebot.v11 import MessageSegment
 
+from .gacha_analysis import getStat
+from .worker_pool import WorkerPool
 from .gacha_achieve import calcAchievement
 from .__meta__ import (
     PIE_FONT,
     PIL_FONT,
-    POOL_INFO,
+    IMAGE_DIR,
+    IMAGE_TTL,
     ACHIEVE_BG,
     GACHA_TYPE,
+    IMAGE_FILE,
     ACHIEVE_FONT,
+    IMAGE_FORMAT,
+    RENDER_QUEUE,
+    ACHIEVE_CACHE,
+    IMAGE_QUALITY,
+    IMAGE_COMPRESS,
+    RENDER_WORKERS,
+    RENDER_POOL_MODE,
     ACHIEVE_BG_DETAIL,
-    datetime_with_tz,
 )
 
+_FONTS = local()
+_ASSETS_LOCK = Lock()
+ASSETS: Dict[str, Image.Image] = {}
+_PANELS_LOCK = Lock()
+_PANELS: Optional[ThreadPoolExecutor] = None
+
 
 def percent(a: int, b: int, rt: Literal["pct", "rgb"] = "pct") -> str:
     """
@@ -83,17 +104,100 @@ def getPoolTag(num: int) -> Tuple[str, str, str]:
 
 def fs(size: int, achieve: bool = False) -> ImageFont.FreeTypeFont:
     """
-    Pillow 绘制字体设置
+    Pillow 绘制字体设置，字体对象在每个绘图线程内只加载一次
 
     * ``param size: int`` 字体大小
     * ``param achieve: bool = False`` 是否为抽卡成就绘图（成就绘图建议使用原神字体）
     - ``return: ImageFont.FreeTypeFont`` Pillow 字体对象
     """
 
-    return ImageFont.truetype(str(ACHIEVE_FONT if achieve else PIL_FONT), size=size)
+    fonts: Dict[Tuple[int, bool], ImageFont.FreeTypeFont] = _FONTS.__dict__
+    if (size, achieve) not in fonts:
+        fonts[(size, achieve)] = ImageFont.truetype(
+            str(ACHIEVE_FONT if achieve else PIL_FONT), size=size
+        )
+    return fonts[(size, achieve)]
+
+
+def drawPoolTitle(poolName: str) -> Image.Image:
+    """
+    卡池统计图标题栏绘制
+
+    * ``param poolName: str`` 卡池名称
+    - ``return: Image.Image`` Pillow 图片对象
+    """
+
+    titleImg = Image.new("RGBA", (500, 75), "#f9f9f9")
+    ImageDraw.Draw(titleImg).text(
+        (
+            int((500 - fs(30).getlength(poolName)) / 2),
+            int((75 - fs(30).getbbox(poolName)[-1]) / 2),
+        ),
+        poolName,
+        font=fs(30),
+        fill="black",
+        stroke_width=1,
+        stroke_fill="grey",
+    )
+    return titleImg
+
+
+def drawAchievedBadge(bg: Image.Image, offset: int) -> Image.Image:
+    """
+    成就背景「达成」标记绘制
+
+    * ``param bg: Image.Image`` 成就详情背景
+    * ``param offset: int`` 标记向上偏移量，仅有「达成」时为 5，同时有总计等数据时为 20
+    - ``return: Image.Image`` Pillow 图片对象
+    """  # noqa: E501
+
+    badgeImg = bg.copy()
+    ImageDraw.Draw(badgeImg).text(
+        (
+            int(572 + (128 - fs(20, True).getlength("达成")) / 2),
+            int(-offset + (100 - fs(20, True).getbbox("达成")[-1]) / 2),
+        ),
+        "达成",
+        font=fs(20, True),
+        fill="#988B81",
+    )
+    return badgeImg
+
+
+def loadAssets() -> None:
+    """
+    绘图素材加载，解码成就背景并预先绘制卡池标题栏、「达成」标记等静态图层，绘图时直接粘贴
+
+    素材只加载一次，加载后的图片由各绘图线程共享，调用方不应修改
+    """  # noqa: E501
+
+    with _ASSETS_LOCK:
+        if ASSETS:
+            return
+        bgPure = Image.open(ACHIEVE_BG).convert("RGBA")
+        bgDetail = Image.open(ACHIEVE_BG_DETAIL).convert("RGBA")
+        assets = {
+            "bgPure": bgPure,
+            "bgDetail": bgDetail,
+            "bgAchieved": drawAchievedBadge(bgDetail, 5),
+            "bgAchievedTotal": drawAchievedBadge(bgDetail, 20),
+        }
+        for banner, poolName in GACHA_TYPE.items():
+            assets[f"title-{banner}"] = drawPoolTitle(poolName)
+        ASSETS.update(assets)
+        logger.debug(f"绘图素材已加载：{'、'.join(ASSETS)}")
+
+
+def initRenderWorker() -> None:
+    """绘图任务池工作线程或工作进程初始化，预先加载字体及绘图素材"""
+
+    for size in [20, 25, 30, 60]:
+        fs(size)
+    for size in [15, 16, 18, 20, 22, 36]:
+        fs(size, True)
+    loadAssets()
 
 
-@run_sync
 def colorfulFive(
     star5Data: List, fontSize: int, maxWidth: int, isWeapon: bool = False
 ) -> Image.Image:
@@ -228,104 +332,11 @@ def colorfulFive(
     return result
 
 
-@run_sync
-def calcStat(gachaLogs: Dict) -> Dict:
-    """
-    统计数据提取
-
-    * ``param gachaLogs: Dict`` 原始抽卡记录数据
-    - ``return: Dict`` 统计数据
-    """
-
-    single = {
-        "total": 0,  # 总抽数
-        "cntNot5": 0,  # 未出五星抽数
-        "cntStar3": 0,  # 三星物品总数
-        "cntChar4": 0,  # 四星角色总数
-        "cntWeapon4": 0,  # 四星武器总数
-        "cntChar5": 0,  # 五星角色总数
-        "cntWeapon5": 0,  # 五星武器总数
-        "star5": [],  # 五星物品列表
-        "startTime": "",  # 抽卡记录开始时间
-        "endTime": "",  # 抽卡记录结束时间
-    }
-    # 重排顺序为 301 302 200 100（角色、武器、常驻、新手
-    renderOrder = sorted(GACHA_TYPE.keys(), key=lambda k: k[0], reverse=True)
-    stat = {}  # 待返回统计数据
-    for banner in renderOrder:
-        if not gachaLogs.get(banner):
-            continue
-        gachaStat = deepcopy(single)
-        gachaList = gachaLogs[banner]
-        gachaList.reverse()
-        counter, pityCounter = 0, 0  # 总抽数计数器、保底计数器
-        upCounter = {}  # UP 物品计数器
-        for item in gachaList:
-            counter += 1  # 总抽数计数器递增
-            pityCounter += 1  # 保底计数器递增
-            rankType = int(item["rank_type"])
-            itemName, itemType = item["name"], item["item_type"]
-            # 更新统计数据字典
-            gachaStat["total"] = counter  # 总抽数更新
-            if rankType == 3:
-                gachaStat["cntStar3"] += 1  # 三星物品总数递增
-            else:
-                t = "cntChar" if itemType == "角色" else "cntWeapon"
-                gachaStat[t + str(rankType)] += 1  # 对应星级对应类型物品总数递增
-                # 对应星级对应类型物品 UP 总数递增
-                gotUpStar5 = False
-                if int(banner) in [301, 302]:
-                    gachaTime = datetime_with_tz(item["time"])
-                    belongTo = [
-                        p
-                        for p in POOL_INFO
-                        if p["Type"] == int(item["gacha_type"])
-                        and gachaTime >= datetime.fromisoformat(p["From"])
-                        and gachaTime <= datetime.fromisoformat(p["To"])
-                    ]
-                    if not belongTo or len(belongTo) > 1:
-                        logger.error(
-                            "卡池 {} 异常的 UP 判断：{}({}) in {}".format(
-                                banner,
-                                item["name"],
-                                item["time"],
-                                "/".join(bp["Name"] for bp in belongTo)
-                                if belongTo
-                                else "null",
-                            )
-                        )
-                    elif item["name"] in belongTo[0]["UpPurpleList"]:
-                        upCounter["cntUp4"] = 1 + upCounter.get("cntUp4", 0)
-                    elif item["name"] in belongTo[0]["UpOrangeList"]:
-                        upCounter["cntUp5"] = 1 + upCounter.get("cntUp5", 0)
-                        gotUpStar5 = True
-                if rankType == 5:
-                    gachaStat["star5"].append(
-                        {"name": itemName, "count": pityCounter, "up": gotUpStar5}
-                    )
-                    pityCounter = 0  # 重置保底计数器
-        # 计算未出五星抽数
-        star5Cnts = [item["count"] for item in gachaStat["star5"]]
-        gachaStat["cntNot5"] = counter - sum(star5Cnts)
-        # 记录抽卡记录开始时间、结束时间
-        if len(gachaList):
-            timeNow = datetime_with_tz().strftime("%Y-%m-%d %H:%M:%S")
-            gachaStat["startTime"] = gachaList[0].get("time", timeNow)
-            gachaStat["endTime"] = gachaList[-1].get("time", timeNow)
-        # UP 物品总数
-        if upCounter:
-            gachaStat.update(upCounter)
-        # 更新待返回统计数据
-        stat[banner] = gachaStat
-    return stat
-
-
-@run_sync
 def drawPie(stat: Dict) -> Tuple[Image.Image, bool]:
     """
     单个饼图绘制
 
-    * ``param stat: Dict`` 统计数据，由 ``calcStat()`` 生成
+    * ``param stat: Dict`` 统计数据，由 ``getStat()`` 生成
     - ``return: Tuple[Image.Image, bool]`` 返回饼图、是否展示三星物品数据
     """
 
@@ -349,7 +360,9 @@ def drawPie(stat: Dict) -> Tuple[Image.Image, bool]:
     # 绘制饼图
     fontproperties = fm.FontProperties(fname=PIE_FONT, size=18)  # type: ignore
     textprops = {"fontproperties": fontproperties}
-    fig, ax = plt.subplots()
+    # 使用面向对象接口绘制，避免多线程同时绘图时共享 pyplot 全局状态
+    fig = Figure()
+    ax = fig.subplots()
     ax.pie(
         sizes,
         labels=labels,
@@ -368,7 +381,7 @@ def drawPie(stat: Dict) -> Tuple[Image.Image, bool]:
     # 生成图片
     ioBytes = BytesIO()
     fig.set_alpha(1.0)
-    plt.savefig(ioBytes, format="png", facecolor="#ffffff")
+    fig.savefig(ioBytes, format="png", facecolor="#ffffff")
     pieImg = Image.open(ioBytes)
     # (640, 480) => (500, 375)
     pieImg = pieImg.resize((500, 375), Image.Resampling.LANCZOS).convert("RGBA")
@@ -376,171 +389,218 @@ def drawPie(stat: Dict) -> Tuple[Image.Image, bool]:
     return pieImg, showStar3
 
 
-async def gnrtGachaInfo(rawData: Dict, uid: str) -> bytes:
+def encodeImage(img: Image.Image, name: str) -> bytes:
     """
-    抽卡统计信息图片生成，通过 pillow 和 matplotlib 绘制图片
+    图片编码，根据 ``IMAGE_FORMAT`` 选择 PNG（RGBA、RGB、调色板）或 WebP（无损、有损）格式
 
-    * ``param rawData: Dict`` 抽卡记录数据
-    * ``param uid: str`` 用户 UID
+    * ``param img: Image.Image`` Pillow 图片对象
+    * ``param name: str`` 图片名称，用于日志
     - ``return: bytes`` 图片字节数据
+    """  # noqa: E501
+
+    start, buf = time(), BytesIO()
+    if IMAGE_FORMAT == "png-rgb":
+        img.convert("RGB").save(buf, format="PNG", compress_level=IMAGE_COMPRESS)
+    elif IMAGE_FORMAT == "png-palette":
+        # 图片大多为纯色块，量化为 256 色调色板后体积显著减小
+        img.convert("RGB").quantize(
+            colors=256, method=Image.Quantize.MEDIANCUT, dither=Image.Dither.NONE
+        ).save(buf, format="PNG", compress_level=IMAGE_COMPRESS)
+    elif IMAGE_FORMAT == "webp":
+        img.save(buf, format="WEBP", lossless=True)
+    elif IMAGE_FORMAT == "webp-lossy":
+        img.convert("RGB").save(buf, format="WEBP", quality=IMAGE_QUALITY)
+    else:
+        img.save(buf, format="PNG", compress_level=IMAGE_COMPRESS)
+    logger.info(
+        "{} 图片 {}x{} 编码为 {} 大小 {:.1f}KB 耗时 {}s".format(
+            name,
+            *img.size,
+            IMAGE_FORMAT,
+            buf.tell() / 1024,
+            round(time() - start, 3),
+        )
+    )
+    return buf.getvalue()
+
+
+def drawPoolPanel(banner: str, poolStat: Dict) -> Image.Image:
+    """
+    单个卡池统计图绘制，由 ``drawGachaInfo()`` 并行调用
+
+    * ``param banner: str`` 卡池类型
+    * ``param poolStat: Dict`` 卡池统计数据，由 ``getStat()`` 生成
+    - ``return: Image.Image`` Pillow 图片对象
     """
 
-    wishStat = await calcStat(rawData)
-    gotPool = [key for key in wishStat if wishStat[key]["total"] > 0]
-    imageList = []
-    for banner in gotPool:
-        poolName, poolStat = GACHA_TYPE[banner], wishStat[banner]
-        isWeapon = True if banner == "302" else False  # 是否为武器祈愿
-        pityCnt = 80 if isWeapon else 90
-        poolImg = Image.new("RGBA", (500, 1500), "#f9f9f9")
-        tDraw = ImageDraw.Draw(poolImg)
-        # 绘制祈愿活动标题
+    poolName = GACHA_TYPE[banner]
+    isWeapon = True if banner == "302" else False  # 是否为武器祈愿
+    pityCnt = 80 if isWeapon else 90
+    poolImg = Image.new("RGBA", (500, 1500), "#f9f9f9")
+    tDraw = ImageDraw.Draw(poolImg)
+    # 粘贴祈愿活动标题
+    poolImg.paste(ASSETS[f"title-{banner}"], (0, 0))
+    poolImgH = 75
+    # 绘制饼状图
+    pieImg, showStar3 = drawPie(poolStat)
+    poolImg.paste(pieImg, (0, poolImgH), pieImg)
+    poolImgH += 375  # pieImg.height
+    if not showStar3:
+        # 绘制隐藏三星数据提示
         tDraw.text(
-            (
-                int((500 - fs(30).getlength(poolName)) / 2),
-                int((75 - fs(30).getbbox(poolName)[-1]) / 2),
-            ),
-            poolName,
-            font=fs(30),
-            fill="black",
-            stroke_width=1,
-            stroke_fill="grey",
+            (15, poolImgH - 375 + 13), "* 三星武器数据已隐藏", font=fs(20), fill="#808080"
         )
-        poolImgH = 75
-        # 绘制饼状图
-        pieImg, showStar3 = await drawPie(poolStat)
-        poolImg.paste(pieImg, (0, poolImgH), pieImg)
-        poolImgH += 375  # pieImg.height
-        if not showStar3:
-            # 绘制隐藏三星数据提示
-            tDraw.text(
-                (15, poolImgH - 375 + 13), "* 三星武器数据已隐藏", font=fs(20), fill="#808080"
-            )
-        # 绘制抽卡时间
-        startTime: str = poolStat["startTime"].split(" ")[0]
-        endTime: str = poolStat["endTime"].split(" ")[0]
-        timeStat = f"{startTime} ~ {endTime}"
-        tDraw.text(
-            (int((500 - fs(20).getlength(timeStat)) / 2), poolImgH - 35),
-            timeStat,
-            font=fs(20),
-            fill="#808080",
+    # 绘制抽卡时间
+    startTime: str = poolStat["startTime"].split(" ")[0]
+    endTime: str = poolStat["endTime"].split(" ")[0]
+    timeStat = f"{startTime} ~ {endTime}"
+    tDraw.text(
+        (int((500 - fs(20).getlength(timeStat)) / 2), poolImgH - 35),
+        timeStat,
+        font=fs(20),
+        fill="#808080",
+    )
+    # 绘制卡池运势
+    star5Data: List[Dict] = poolStat["star5"]
+    star5Avg = (
+        sum(item["count"] for item in star5Data) / len(star5Data) if star5Data else 0
+    )
+    poolTag, poolTagBg, poolTagEdge = getPoolTag(round(star5Avg))
+    tDraw.rounded_rectangle(
+        (500 - 13 - 80, poolImgH - 13 - 80, 500 - 13, poolImgH - 13),
+        fill=poolTagBg,
+        radius=15,
+        width=0,
+    )
+    tDraw.text(
+        (
+            int(500 - 13 - 80 + (80 - fs(60).getlength(poolTag)) / 2),
+            int(poolImgH - 15 - 80 + (80 - fs(60).getbbox(poolTag)[-1]) / 2),
+        ),
+        poolTag,
+        font=fs(60),
+        fill="#ffffff",
+        stroke_width=2,
+        stroke_fill=poolTagEdge,
+    )
+    poolImgH += 20
+    # 绘制抽数统计
+    poolTotal: int = poolStat["total"]
+    notStar5: int = poolStat["cntNot5"]
+    texts = ["共计 ", str(poolTotal), " 抽，相当于 ", str(poolTotal * 160), " 原石"]
+    if notStar5 and poolName != "新手祈愿":
+        texts.extend(
+            [
+                "\n",
+                str(notStar5),
+                " 抽未出{}五星，最多还需 ".format(
+                    "限定"
+                    if ("活动祈愿" in poolName) and star5Data and (not star5Data[-1]["up"])
+                    else ""
+                ),
+                str((pityCnt - notStar5) * 160),
+                " 原石",
+            ]
         )
-        # 绘制卡池运势
-        star5Data: List[Dict] = poolStat["star5"]
-        star5Avg = (
-            sum(item["count"] for item in star5Data) / len(star5Data)
-            if star5Data
-            else 0
+    startW = 20
+    for txtIdx, text in enumerate(texts):
+        if text == "\n":
+            poolImgH += fs(25).getbbox("高")[-1] + 10
+            startW = 20
+            continue
+        color = (
+            (
+                "#1890ff"
+                if txtIdx in [1, 3]
+                else percent(
+                    (pityCnt - int(text)) if int(text) < 91 else (pityCnt - notStar5),
+                    pityCnt,
+                    "rgb",
+                )
+            )
+            if text.isdigit()
+            else "black"
         )
-        poolTag, poolTagBg, poolTagEdge = getPoolTag(round(star5Avg))
-        tDraw.rounded_rectangle(
-            (500 - 13 - 80, poolImgH - 13 - 80, 500 - 13, poolImgH - 13),
-            fill=poolTagBg,
-            radius=15,
-            width=0,
+        tDraw.text((startW, poolImgH), text, font=fs(25), fill=color)
+        startW += fs(25).getlength(text)
+    poolImgH += fs(25).getbbox("高")[-1] + 20 * 2
+    # 绘制概率统计
+    totalList = [
+        {
+            "rank": "五星",
+            "cnt": poolStat["cntWeapon5"] + poolStat["cntChar5"],
+            "cntUp": poolStat.get("cntUp5", 0),
+            "color": "#C0713D",
+        },
+        {
+            "rank": "四星",
+            "cnt": poolStat["cntWeapon4"] + poolStat["cntChar4"],
+            "cntUp": poolStat.get("cntUp4", 0),
+            "color": "#A65FE2",
+        },
+        {"rank": "三星", "cnt": poolStat["cntStar3"], "color": "#4D8DF7"},
+    ]
+    for item in totalList:
+        if not item["cnt"]:
+            continue
+        cntStr = "{}：{} 次{}".format(
+            item["rank"],
+            item["cnt"],
+            f"（{item['cntUp']} 次限定）" if item.get("cntUp") else "",
         )
+        probStr = f"[{item['cnt'] / poolTotal * 100:.2f}%]"
+        tDraw.text((20, poolImgH), cntStr, font=fs(25), fill=item["color"])
+        probStrW = fs(25).getlength(probStr)
         tDraw.text(
-            (
-                int(500 - 13 - 80 + (80 - fs(60).getlength(poolTag)) / 2),
-                int(poolImgH - 15 - 80 + (80 - fs(60).getbbox(poolTag)[-1]) / 2),
-            ),
-            poolTag,
-            font=fs(60),
-            fill="#ffffff",
-            stroke_width=2,
-            stroke_fill=poolTagEdge,
+            (int((480 if int(banner) in [301, 302] else 400) - probStrW), poolImgH),
+            probStr,
+            font=fs(25),
+            fill=item["color"],
         )
-        poolImgH += 20
-        # 绘制抽数统计
-        poolTotal: int = poolStat["total"]
-        notStar5: int = poolStat["cntNot5"]
-        texts = ["共计 ", str(poolTotal), " 抽，相当于 ", str(poolTotal * 160), " 原石"]
-        if notStar5 and poolName != "新手祈愿":
-            texts.extend(
-                [
-                    "\n",
-                    str(notStar5),
-                    " 抽未出{}五星，最多还需 ".format(
-                        "限定"
-                        if ("活动祈愿" in poolName)
-                        and star5Data
-                        and (not star5Data[-1]["up"])
-                        else ""
-                    ),
-                    str((pityCnt - notStar5) * 160),
-                    " 原石",
-                ]
-            )
-        startW = 20
-        for txtIdx, text in enumerate(texts):
-            if text == "\n":
-                poolImgH += fs(25).getbbox("高")[-1] + 10
-                startW = 20
-                continue
-            color = (
-                (
-                    "#1890ff"
-                    if txtIdx in [1, 3]
-                    else percent(
-                        (pityCnt - int(text))
-                        if int(text) < 91
-                        else (pityCnt - notStar5),
-                        pityCnt,
-                        "rgb",
-                    )
-                )
-                if text.isdigit()
-                else "black"
-            )
-            tDraw.text((startW, poolImgH), text, font=fs(25), fill=color)
-            startW += fs(25).getlength(text)
-        poolImgH += fs(25).getbbox("高")[-1] + 20 * 2
-        # 绘制概率统计
-        totalList = [
-            {
-                "rank": "五星",
-                "cnt": poolStat["cntWeapon5"] + poolStat["cntChar5"],
-                "cntUp": poolStat.get("cntUp5", 0),
-                "color": "#C0713D",
-            },
-            {
-                "rank": "四星",
-                "cnt": poolStat["cntWeapon4"] + poolStat["cntChar4"],
-                "cntUp": poolStat.get("cntUp4", 0),
-                "color": "#A65FE2",
-            },
-            {"rank": "三星", "cnt": poolStat["cntStar3"], "color": "#4D8DF7"},
-        ]
-        for item in totalList:
-            if not item["cnt"]:
-                continue
-            cntStr = "{}：{} 次{}".format(
-                item["rank"],
-                item["cnt"],
-                f"（{item['cntUp']} 次限定）" if item.get("cntUp") else "",
-            )
-            probStr = f"[{item['cnt'] / poolTotal * 100:.2f}%]"
-            tDraw.text((20, poolImgH), cntStr, font=fs(25), fill=item["color"])
-            probStrW = fs(25).getlength(probStr)
-            tDraw.text(
-                (int((480 if int(banner) in [301, 302] else 400) - probStrW), poolImgH),
-                probStr,
-                font=fs(25),
-                fill=item["color"],
+        poolImgH += fs(25).getbbox("高")[-1] + 20
+    # 绘制五星物品统计
+    poolImgH += 20
+    if star5Data:
+        statPic = colorfulFive(star5Data, 25, 460, isWeapon)
+        poolImg.paste(statPic, (20, poolImgH), statPic)
+        poolImgH += statPic.size[1]
+    # 绘制完成
+    poolImgH += 20
+    return poolImg.crop((0, 0, 500, poolImgH))
+
+
+def panelExecutor() -> ThreadPoolExecutor:
+    """
+    卡池统计图绘制线程池，同一绘图进程内的绘图任务共用，首次使用时创建
+
+    进程池模式下由各工作进程各自创建，不会在 fork 前存在
+    """
+
+    global _PANELS
+    with _PANELS_LOCK:
+        if _PANELS is None:
+            _PANELS = ThreadPoolExecutor(
+                max_workers=len(GACHA_TYPE),
+                thread_name_prefix="gachalogs-panel",
+                initializer=initRenderWorker,
             )
-            poolImgH += fs(25).getbbox("高")[-1] + 20
-        # 绘制五星物品统计
-        poolImgH += 20
-        if star5Data:
-            statPic = await colorfulFive(star5Data, 25, 460, isWeapon)
-            poolImg.paste(statPic, (20, poolImgH), statPic)
-            poolImgH += statPic.size[1]
-        # 绘制完成
-        poolImgH += 20
-        poolImg = poolImg.crop((0, 0, 500, poolImgH))
-        imageList.append(poolImg)
+    return _PANELS
+
 
+def drawGachaInfo(wishStat: Dict, uid: str) -> bytes:
+    """
+    抽卡统计信息图片绘制，有记录的卡池统计图并行绘制后拼接并绘制 UID，在绘图任务池中作为一个任务执行
+
+    * ``param wishStat: Dict`` 各卡池统计数据，由 ``getStat()`` 生成
+    * ``param uid: str`` 用户 UID
+    - ``return: bytes`` 图片字节数据
+    """  # noqa: E501
+
+    # 各卡池统计图互不依赖，在绘图任务内并行绘制，耗时接近最慢的卡池
+    banners = [banner for banner, stat in wishStat.items() if stat["total"] > 0]
+    imageList = list(
+        panelExecutor().map(drawPoolPanel, banners, [wishStat[b] for b in banners])
+    )
     # 合并图片
     maxWidth = 500 * len(imageList)
     maxHeight = max([img.height for img in imageList])
@@ -560,21 +620,174 @@ async def gnrtGachaInfo(rawData: Dict, uid: str) -> bytes:
         fill="#808080",
     )
 
-    buf = BytesIO()
-    resultImg.save(buf, format="PNG")
-    return buf.getvalue()
+    return encodeImage(resultImg, f"UID{uid} 抽卡记录")
 
 
-async def gnrtGachaArchieve(rawData: Dict, uid: str) -> bytes:
+@run_sync
+def saveImage(img: bytes) -> Path:
+    """
+    图片写入本地共享目录，同时清理超过保留时间的旧图片
+
+    * ``param img: bytes`` 图片字节数据
+    - ``return: Path`` 图片文件路径
     """
-    抽卡成就图片生成，通过 pillow 绘制图片
+
+    now = time()
+    for old in IMAGE_DIR.iterdir():
+        try:
+            if now - old.stat().st_mtime > IMAGE_TTL:
+                old.unlink()
+        except FileNotFoundError:
+            continue
+    suffix = "webp" if IMAGE_FORMAT.startswith("webp") else "png"
+    imgPath = IMAGE_DIR / f"{int(now * 1000)}-{uuid4().hex[:8]}.{suffix}"
+    imgPath.write_bytes(img)
+    return imgPath
+
+
+async def imageSegment(img: bytes) -> MessageSegment:
+    """
+    图片消息段生成，启用 ``IMAGE_FILE`` 时发送 ``file://`` 路径，否则发送图片字节数据
+
+    * ``param img: bytes`` 图片字节数据
+    - ``return: MessageSegment`` 图片消息段
+    """
+
+    if not IMAGE_FILE:
+        return MessageSegment.image(img)
+    imgPath = await saveImage(img)
+    return MessageSegment.image(imgPath.resolve().as_uri())
+
+
+# 绘图任务池，进程池模式下仅统计数据和成就数据跨进程传递
+RENDER_POOL = WorkerPool(
+    "绘图", RENDER_POOL_MODE, RENDER_WORKERS, RENDER_QUEUE, initRenderWorker
+)
+
+
+async def gnrtGachaInfo(rawData: Dict, uid: str) -> bytes:
+    """
+    抽卡统计信息图片生成，统计数据提取后交由绘图任务池绘制
 
     * ``param rawData: Dict`` 抽卡记录数据
     * ``param uid: str`` 用户 UID
-    - ``return: bytes`` 图片字节数据
+    - ``return: bytes`` 图片字节数据，绘图任务池排队已满时抛出 ``PoolBusyError``
+    """
+
+    wishStat = await getStat(uid, rawData)
+    # 每次请求只占用一个任务位，各卡池统计图在同一任务中绘制及合成，图片不跨进程传递
+    return await RENDER_POOL.run(drawGachaInfo, wishStat, uid)
+
+
+@lru_cache(maxsize=ACHIEVE_CACHE)
+def drawAchieveTile(
+    title: str, info: str, achievedTime: Optional[str], value: Optional[str]
+) -> Image.Image:
+    """
+    单个成就绘制，成就图块只由成就内容决定，按内容缓存。调用方不应修改返回的图片
+
+    * ``param title: str`` 成就名称
+    * ``param info: str`` 成就描述
+    * ``param achievedTime: Optional[str]`` 达成时间等数据
+    * ``param value: Optional[str]`` 达成、总计等数据
+    - ``return: Image.Image`` Pillow 图片对象，尺寸为 720x110
+    """
+
+    tile = Image.new("RGBA", (720, 110), "#f9f9f9")
+    drawer = ImageDraw.Draw(tile)
+    if not value:
+        bg = ASSETS["bgPure"]
+    elif achievedTime in ["小保底歪的概率", "持续时间"]:
+        bg = ASSETS["bgDetail"]
+    elif value == "达成":
+        bg = ASSETS["bgAchieved"]
+    else:
+        bg = ASSETS["bgAchievedTotal"]
+    tile.paste(bg, (10, 0), bg)
+    # 描述分行，超过三行需要调整后面 名称 描述 绘制位置
+    multilineText, tmpText, tmpLength = [], "", 0
+    maxLength = 445 if value else 565
+    for s in info:
+        length = fs(16, True).getlength(s)
+        if tmpLength + length <= maxLength:
+            tmpText += s
+            tmpLength += length
+        else:
+            multilineText.append(tmpText)
+            tmpText = s
+            tmpLength = length
+    if tmpText.strip():
+        multilineText.append(tmpText)
+    multilineText = [s.strip() for s in multilineText if s.strip()]
+    tooMany = len(multilineText) >= 3
+    # 名称
+    drawer.text(
+        (115, 18 - (11 if tooMany else 0)),
+        title,
+        font=fs(22, True),
+        fill="#585757",
+    )
+    # 描述
+    spacing = (0.3 if tooMany else 0.1) * 16
+    drawer.multiline_text(
+        (
+            125,
+            100
+            - 18
+            + (11 if tooMany else 0)
+            - 16 * len(multilineText)
+            - spacing * (len(multilineText) - 1),
+        ),
+        "\n".join(multilineText),
+        font=fs(16, True),
+        fill="#988B81",
+        spacing=spacing,
+        align="left",
+    )
+    # 详情
+    if value:
+        # 「达成」标记已预先绘制在背景中
+        hasAchieve = achievedTime not in ["小保底歪的概率", "持续时间"]
+        if value != "达成":
+            # 绘制 总计 等数据
+            drawer.text(
+                (
+                    int(582 + (128 - fs(20, True).getlength(value)) / 2),
+                    int(
+                        (5 if hasAchieve else 0)
+                        + (100 - fs(20, True).getbbox(value)[-1]) / 2
+                    ),
+                ),
+                value,
+                font=fs(20, True),
+                fill="#84603D",
+            )
+        # 绘制 时间 等数据
+        drawer.text(
+            (
+                int(582 + (128 - fs(15, True).getlength(achievedTime)) / 2),
+                int(76 + (20 - fs(15, True).getbbox(achievedTime)[-1]) / 2),
+            ),
+            achievedTime,
+            font=fs(15, True),
+            fill="#988B81",
+        )
+
+    return tile
+
+
+def drawGachaArchieve(
+    scope: str, achievements: List[Dict[str, str]], uid: str
+) -> bytes:
     """
+    抽卡成就图片绘制，通过 pillow 绘制图片，在绘图任务池中执行
+
+    * ``param scope: str`` 记录范围
+    * ``param achievements: List[Dict[str, str]]`` 成就数据，由 ``calcAchievement()`` 生成
+    * ``param uid: str`` 用户 UID
+    - ``return: bytes`` 图片字节数据
+    """  # noqa: E501
 
-    scope, achievements = await calcAchievement(rawData)
     result = Image.new("RGBA", (720, 110 * len(achievements) + 10 + 100), "#f9f9f9")
     drawer = ImageDraw.Draw(result)
 
@@ -595,109 +808,27 @@ async def gnrtGachaArchieve(rawData: Dict, uid: str) -> bytes:
         fill="#808080",
     )
 
-    bgPure = Image.open(ACHIEVE_BG)
-    bgDetail = Image.open(ACHIEVE_BG_DETAIL)
+    # 成就图块逐个拼接
     for aIdx, achievement in enumerate(achievements):
-        startHeight = 110 * (aIdx + 1)
-        bg = bgDetail if achievement.get("value") else bgPure
-        result.paste(bg, (10, startHeight), bg)
-        # 描述分行，超过三行需要调整后面 名称 描述 绘制位置
-        multilineText, tmpText, tmpLength = [], "", 0
-        maxLength = 445 if achievement.get("value") else 565
-        for s in achievement["info"]:
-            length = fs(16, True).getlength(s)
-            if tmpLength + length <= maxLength:
-                tmpText += s
-                tmpLength += length
-            else:
-                multilineText.append(tmpText)
-                tmpText = s
-                tmpLength = length
-        if tmpText.strip():
-            multilineText.append(tmpText)
-        multilineText = [s.strip() for s in multilineText if s.strip()]
-        tooMany = len(multilineText) >= 3
-        # 名称
-        drawer.text(
-            (115, startHeight + 18 - (11 if tooMany else 0)),
+        tile = drawAchieveTile(
             achievement["title"],
-            font=fs(22, True),
-            fill="#585757",
-        )
-        # 描述
-        spacing = (0.3 if tooMany else 0.1) * 16
-        drawer.multiline_text(
-            (
-                125,
-                startHeight
-                + 100
-                - 18
-                + (11 if tooMany else 0)
-                - 16 * len(multilineText)
-                - spacing * (len(multilineText) - 1),
-            ),
-            "\n".join(multilineText),
-            font=fs(16, True),
-            fill="#988B81",
-            spacing=spacing,
-            align="left",
+            achievement["info"],
+            achievement.get("achievedTime"),
+            achievement.get("value"),
         )
-        # 详情
-        if achievement.get("value"):
-            hasAchieve = achievement["achievedTime"] not in ["小保底歪的概率", "持续时间"]
-            if hasAchieve:
-                # 绘制 达成
-                drawer.text(
-                    (
-                        int(582 + (128 - fs(20, True).getlength("达成")) / 2),
-                        int(
-                            startHeight
-                            - (5 if achievement["value"] == "达成" else 20)
-                            + (100 - fs(20, True).getbbox("达成")[-1]) / 2
-                        ),
-                    ),
-                    "达成",
-                    font=fs(20, True),
-                    fill="#988B81",
-                )
-            if achievement["value"] != "达成":
-                # 绘制 总计 等数据
-                drawer.text(
-                    (
-                        int(
-                            582
-                            + (128 - fs(20, True).getlength(achievement["value"])) / 2
-                        ),
-                        int(
-                            startHeight
-                            + (5 if hasAchieve else 0)
-                            + (100 - fs(20, True).getbbox(achievement["value"])[-1]) / 2
-                        ),
-                    ),
-                    achievement["value"],
-                    font=fs(20, True),
-                    fill="#84603D",
-                )
-            # 绘制 时间 等数据
-            drawer.text(
-                (
-                    int(
-                        582
-                        + (128 - fs(15, True).getlength(achievement["achievedTime"]))
-                        / 2
-                    ),
-                    int(
-                        startHeight
-                        + 76
-                        + (20 - fs(15, True).getbbox(achievement["achievedTime"])[-1])
-                        / 2
-                    ),
-                ),
-                achievement["achievedTime"],
-                font=fs(15, True),
-                fill="#988B81",
-            )
+        result.paste(tile, (0, 110 * (aIdx + 1)))
 
-    buf = BytesIO()
-    result.save(buf, format="PNG")
-    return buf.getvalue()
+    return encodeImage(result, f"UID{uid} 抽卡成就")
+
+
+async def gnrtGachaArchieve(rawData: Dict, uid: str) -> bytes:
+    """
+    抽卡成就图片生成，成就数据提取后交由绘图任务池绘制
+
+    * ``param rawData: Dict`` 抽卡记录数据
+    * ``param uid: str`` 用户 UID
+    - ``return: bytes`` 图片字节数据，绘图任务池排队已满时抛出 ``PoolBusyError``
+    """
+
+    scope, achievements = await calcAchievement(uid, rawData)
+    return await RENDER_POOL.run(drawGachaArchieve, scope, achievements, uid)
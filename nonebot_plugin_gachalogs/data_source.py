@@ -12,7 +12,10 @@ from typing import Dict, List, Tuple, Union, Literal
 
 from httpx import AsyncClient
 from nonebot.log import logger
+from nonebot.utils import run_sync
 
+from .gacha_analysis import calcSummaryStat
+from .gacha_achieve import calcSummaryAchieve
 from .__meta__ import (
     POOL_API,
     ROLE_API,
@@ -20,6 +23,7 @@ from .__meta__ import (
     LOCAL_DIR,
     TOKEN_API,
     EXPIRE_SEC,
+    EXPORT_DIR,
     GACHA_TYPE,
     AUTHKEY_API,
     CLIENT_SALT,
@@ -135,6 +139,19 @@ async def configHelper(qq: str, data: Dict = {}) -> Dict:
         return cfg if qq == "0" else cfg.get(qq, {"error": f"暂无 QQ{qq} 的抽卡记录配置！"})
 
 
+def readLogs(logsFile: Path) -> Dict:
+    """
+    读取抽卡记录缓存文件，记录较多时读取及解析耗时较长，需在线程中调用
+
+    * ``param logsFile: Path`` 抽卡记录缓存文件路径
+    - ``return: Dict`` 抽卡记录数据
+    """
+
+    logs = json.loads(logsFile.read_text(encoding="utf-8"))
+    assert isinstance(logs, Dict)
+    return logs
+
+
 async def logsHelper(file: Union[Path, str], data: Dict = {}) -> Tuple[str, Dict]:
     """
     抽卡记录缓存助手，既可根据 ``file`` 路径读取抽卡记录，也可根据 ``data`` 数据写入/删除抽卡记录缓存
@@ -155,19 +172,30 @@ async def logsHelper(file: Union[Path, str], data: Dict = {}) -> Tuple[str, Dict
         try:
             if delMode:
                 logsFile.unlink(missing_ok=True)
+                (LOCAL_DIR / f"gachastat-{uid}.json").unlink(missing_ok=True)
+                (LOCAL_DIR / f"gachaachieve-{uid}.json").unlink(missing_ok=True)
+                for cached in EXPORT_DIR.glob(f"gachalogs-{uid}-*"):
+                    cached.unlink(missing_ok=True)
             else:
                 logsFile.write_text(
                     json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8"
                 )
             logger.info(f"UID{uid} 的抽卡记录已{modeStr}")
-            return uid, {}
         except Exception as e:
             logger.opt(exception=e).error(f"UID{uid} 的抽卡记录缓存{modeStr}失败")
             return f"UID{uid} 的抽卡记录缓存{modeStr}失败！", {}
+        # 统计摘要及成就摘要随记录更新，仅计入新增记录。摘要可随时从记录重建，更新失败不影响记录写入
+        if not delMode:
+            summaries = {"统计": calcSummaryStat, "成就": calcSummaryAchieve}
+            for name, calcSummary in summaries.items():
+                try:
+                    await run_sync(calcSummary)(uid, data, save=True)
+                except Exception as e:
+                    logger.opt(exception=e).error(f"UID{uid} 的{name}摘要更新失败")
+        return uid, {}
     elif logsFile.exists():
-        logs = json.loads(logsFile.read_text(encoding="utf-8"))
-        assert isinstance(logs, Dict)
-        return uid, logs
+        # 在线程中读取，以免打包导出全部用户记录时阻塞事件循环
+        return uid, await run_sync(readLogs)(logsFile)
     else:
         raise ValueError(f"UID{uid} 的本地抽卡记录不存在！")
 
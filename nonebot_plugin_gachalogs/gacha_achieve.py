@@ -1,233 +1,246 @@
-import asyncio
-from datetime import datetime
+from heapq import merge
+from itertools import groupby
 from collections import Counter
-from typing import Dict, List, Tuple
+from operator import itemgetter
+from typing import Any, Dict, List, Type, Tuple
 
 from nonebot.log import logger
 from nonebot.utils import run_sync
 
-from .__meta__ import POOL_INFO, GACHA_TYPE, datetime_with_tz
+from .gacha_analysis import RENDER_ORDER, recordMark, loadSummary, saveSummary
+from .__meta__ import POOL_DIGEST, getPoolUp, datetime_with_tz, timestamp_with_tz
 
 
-@run_sync
-def getLogsAnalysis(gachaLogs: Dict) -> Dict:
-    """获取抽卡记录分析数据"""
+def mergeItemStr(items: List[str]) -> str:
+    """合并出货记录消息，最多显示三个物品"""
 
-    analysis = {
-        "all": {"5-角色": {}, "5-武器": {}, "4-角色": {}, "4-武器": {}, "3-武器": {}},  # 全物品出货统计
-        "null": [],  # 未抽卡池统计
-        "five": [],  # 五星物品统计
-        "logs": {},  # 按抽卡时间分离记录
-    }
-    renderOrder = sorted(GACHA_TYPE.keys(), key=lambda k: k[0], reverse=True)
-    for banner in renderOrder:
-        gachaList = gachaLogs.get(banner)
-        if not gachaList:
-            analysis["null"] += [banner]  # 未抽卡池统计
-            continue
+    _items = [f"「{k}」{f'×{v}' if v > 1 else ''}" for k, v in Counter(items).items()]
+    return "、".join(_items[:3]) + ("等" if len(_items) > 3 else "")
 
-        gachaList.reverse()
-        pityCounter = 0  # 保底计数
 
-        # 遍历某个卡池全部记录
-        for item in gachaList:
-            rankType = int(item["rank_type"])
-            itemName, itemType = item["name"], item["item_type"]
+class AchievementRule:
+    """
+    成就规则基类，每次计算成就时重新实例化
 
-            pityCounter += 1  # 保底计数递增
+    子类按需重写 ``onRecord()`` 订阅单条记录、重写 ``onGroup()`` 订阅同一时间的单抽或十连，
+    所有规则共用一次按时间顺序的遍历，遍历结束后由 ``result()`` 给出成就
 
-            # 全物品出货统计
-            allIdx = f"{rankType}-{itemType}"
-            analysis["all"][allIdx][itemName] = (
-                analysis["all"][allIdx].get(itemName, 0) + 1
-            )
+    规则的实例属性即为累积状态，随成就摘要保存并在下次计算时恢复，只能使用可 JSON 序列化的数据
+    """  # noqa: E501
 
-            # 按抽卡时间分离记录
-            dropCounter = analysis["logs"].get(item["time"], [])
-            dropSimple = {
-                "pool": banner,
-                "name": itemName,
-                "rank": rankType,
-                "type": itemType,
-            }
-            if rankType == 5:
-                dropSimple["pity"] = pityCounter
-                if banner in ["301", "302"]:
-                    gachaTime = datetime_with_tz(item["time"])
-                    belongTo = [
-                        p
-                        for p in POOL_INFO
-                        if p["Type"] == int(item["gacha_type"])
-                        and gachaTime >= datetime.fromisoformat(p["From"])
-                        and gachaTime <= datetime.fromisoformat(p["To"])
-                    ]
-                    if not belongTo or len(belongTo) > 1:
-                        logger.error(
-                            "卡池 {} 异常的 UP 判断：{}({}) in {}".format(
-                                banner,
-                                item["name"],
-                                item["time"],
-                                "/".join(bp["Name"] for bp in belongTo)
-                                if belongTo
-                                else "null",
-                            )
-                        )
-                    dropSimple["up"] = item["name"] in belongTo[0]["UpOrangeList"]
-                analysis["five"].append(
-                    {**dropSimple, "time": item["time"].split()[0]}
-                )  # 五星物品统计
-                pityCounter = 0  # 重置保底计数器
-
-            analysis["logs"][item["time"]] = dropCounter + [dropSimple]
-
-    # 记录按时间重新排序
-    analysis["logs"] = dict(
-        sorted(
-            analysis["logs"].items(),
-            key=lambda x: datetime_with_tz(x[0]),
-        )
-    )
+    def onRecord(self, timeStr: str, drop: Dict) -> None:
+        """
+        单条记录事件
 
-    return analysis
+        * ``param timeStr: str`` 抽卡时间
+        * ``param drop: Dict`` 记录，由 ``gnrtDrops()`` 生成
+        """
 
+    def onGroup(self, timeStr: str, drops: Tuple[Dict, ...]) -> None:
+        """
+        同一时间的单抽或十连事件
 
-def mergeItemStr(items: List[str]) -> str:
-    """合并出货记录消息，最多显示三个物品"""
-
-    _items = [f"「{k}」{f'×{v}' if v > 1 else ''}" for k, v in Counter(items).items()]
-    return "、".join(_items[:3]) + ("等" if len(_items) > 3 else "")
+        * ``param timeStr: str`` 抽卡时间
+        * ``param drops: Tuple[Dict, ...]`` 该时间的全部记录
+        """
 
+    def result(self) -> List[Dict[str, str]]:
+        """
+        遍历结束后给出成就，不应修改累积状态
 
-@run_sync
-def gachaPityLimit(fiveData: List[Dict]) -> List[Dict[str, str]]:
-    """五星最欧最非成就"""
+        - ``return: List[Dict[str, str]]`` 成就数据
+        """
 
-    if not len(fiveData):
         return []
-    achievements = []
 
-    _fiveData = sorted(
-        fiveData,
-        key=lambda x: (x["pity"], datetime_with_tz(x["time"], "%Y-%m-%d")),
-    )
-    minPityItem, maxPityItem = _fiveData[0], _fiveData[-1]
-    if minPityItem["pity"] <= 30:
-        _results = [d["name"] for d in fiveData if d["pity"] == minPityItem["pity"]]
-        achievements.append(
-            {
-                "title": "「欧皇时刻」",
-                "info": "只抽了 {} 次就抽到了{}{}".format(
-                    minPityItem["pity"],
-                    mergeItemStr(_results),
-                    "，你的欧气无人能敌！" if minPityItem["pity"] <= 5 else "",
-                ),
-                "achievedTime": minPityItem["time"].replace("-", "/"),
-                "value": "达成" if len(_results) == 1 else f"总计 {len(_results)}",
-            }
-        )
-    if maxPityItem["pity"] >= 30:
-        _rarity = (
-            ["百", "千", "万", "十万", "百万"][maxPityItem["pity"] - 84]
-            if 83 < maxPityItem["pity"] < 89
-            else "无穷"
-        )
-        _results = [d["name"] for d in fiveData if d["pity"] == maxPityItem["pity"]]
-        achievements.append(
-            {
-                "title": "「原来非酋竟是我自己」",
-                "info": "抽了 {} 次才最终抽到了{}{}".format(
-                    maxPityItem["pity"],
-                    mergeItemStr(_results),
-                    f"，你竟是{_rarity}里挑一的非酋！" if minPityItem["pity"] >= 84 else "",
-                ),
-                "achievedTime": maxPityItem["time"].replace("-", "/"),
-                "value": "达成" if len(_results) == 1 else f"总计 {len(_results)}",
-            }
+
+# 成就规则注册表，按注册顺序展示成就
+ACHIEVEMENT_RULES: List[Type[AchievementRule]] = []
+
+
+def achievement(rule: Type[AchievementRule]) -> Type[AchievementRule]:
+    """成就规则注册装饰器"""
+
+    ACHIEVEMENT_RULES.append(rule)
+    return rule
+
+
+@achievement
+class GachaPityLimit(AchievementRule):
+    """五星最欧最非成就"""
+
+    def __init__(self) -> None:
+        # 保底内抽数最少、最多的五星物品
+        self.low: List[Dict] = []
+        self.high: List[Dict] = []
+
+    def onRecord(self, timeStr: str, drop: Dict) -> None:
+        if drop["rank"] != 5:
+            return
+        five = {
+            "pool": drop["pool"],
+            "name": drop["name"],
+            "pity": drop["pity"],
+            "time": timeStr.split()[0],
+        }
+        if not self.low or five["pity"] < self.low[0]["pity"]:
+            self.low = [five]
+        elif five["pity"] == self.low[0]["pity"]:
+            self.low.append(five)
+        if not self.high or five["pity"] > self.high[0]["pity"]:
+            self.high = [five]
+        elif five["pity"] == self.high[0]["pity"]:
+            self.high.append(five)
+
+    def result(self) -> List[Dict[str, str]]:
+        if not self.low:
+            return []
+        # 按卡池顺序排列，与逐个卡池遍历的结果一致
+        fiveData = sorted(
+            self.low
+            + (self.high if self.high[0]["pity"] != self.low[0]["pity"] else []),
+            key=lambda x: RENDER_ORDER.index(x["pool"]),
         )
+        achievements = []
 
-    return achievements
+        _fiveData = sorted(fiveData, key=lambda x: (x["pity"], x["time"]))
+        minPityItem, maxPityItem = _fiveData[0], _fiveData[-1]
+        if minPityItem["pity"] <= 30:
+            _results = [d["name"] for d in fiveData if d["pity"] == minPityItem["pity"]]
+            achievements.append(
+                {
+                    "title": "「欧皇时刻」",
+                    "info": "只抽了 {} 次就抽到了{}{}".format(
+                        minPityItem["pity"],
+                        mergeItemStr(_results),
+                        "，你的欧气无人能敌！" if minPityItem["pity"] <= 5 else "",
+                    ),
+                    "achievedTime": minPityItem["time"].replace("-", "/"),
+                    "value": "达成" if len(_results) == 1 else f"总计 {len(_results)}",
+                }
+            )
+        if maxPityItem["pity"] >= 30:
+            _rarity = (
+                ["百", "千", "万", "十万", "百万"][maxPityItem["pity"] - 84]
+                if 83 < maxPityItem["pity"] < 89
+                else "无穷"
+            )
+            _results = [d["name"] for d in fiveData if d["pity"] == maxPityItem["pity"]]
+            achievements.append(
+                {
+                    "title": "「原来非酋竟是我自己」",
+                    "info": "抽了 {} 次才最终抽到了{}{}".format(
+                        maxPityItem["pity"],
+                        mergeItemStr(_results),
+                        f"，你竟是{_rarity}里挑一的非酋！" if minPityItem["pity"] >= 84 else "",
+                    ),
+                    "achievedTime": maxPityItem["time"].replace("-", "/"),
+                    "value": "达成" if len(_results) == 1 else f"总计 {len(_results)}",
+                }
+            )
+
+        return achievements
 
 
-@run_sync
-def gachaNotExist(nullData: List[str]) -> List[Dict[str, str]]:
+@achievement
+class GachaNotExist(AchievementRule):
     """未抽卡池成就"""
 
-    achievements = []
+    def __init__(self) -> None:
+        self.pools: List[str] = []
 
-    if "100" in nullData:
-        achievements.append({"title": "「永远的新手」", "info": "没有在「新手祈愿」中进行抽卡"})
-    if "200" in nullData:
-        achievements.append({"title": "「传说中的毒池」", "info": "没有在「常驻祈愿」中进行抽卡"})
-    if "301" in nullData:
-        achievements.append({"title": "「角色 UP 池？不稀罕！」", "info": "没有在「角色活动祈愿」中进行抽卡"})
-    if "302" in nullData:
-        achievements.append({"title": "「武器池？能吃吗？」", "info": "没有在「武器活动祈愿」中进行抽卡"})
+    def onGroup(self, timeStr: str, drops: Tuple[Dict, ...]) -> None:
+        for pool in {x["pool"] for x in drops}.difference(self.pools):
+            self.pools.append(pool)
 
-    return achievements
+    def result(self) -> List[Dict[str, str]]:
+        nullData = [b for b in RENDER_ORDER if b not in self.pools]
+        achievements = []
 
+        if "100" in nullData:
+            achievements.append({"title": "「永远的新手」", "info": "没有在「新手祈愿」中进行抽卡"})
+        if "200" in nullData:
+            achievements.append({"title": "「传说中的毒池」", "info": "没有在「常驻祈愿」中进行抽卡"})
+        if "301" in nullData:
+            achievements.append({"title": "「角色 UP 池？不稀罕！」", "info": "没有在「角色活动祈愿」中进行抽卡"})
+        if "302" in nullData:
+            achievements.append({"title": "「武器池？能吃吗？」", "info": "没有在「武器活动祈愿」中进行抽卡"})
 
-@run_sync
-def gachaWrongUp(fiveData: List[Dict]) -> List[Dict[str, str]]:
-    """角色活动祈愿限定 UP 成就"""
+        return achievements
 
-    _fiveData = [x for x in fiveData if x["pool"] == "301"]
-    if not len(_fiveData):
-        return []
-
-    hitCount = len([x for x in _fiveData if x["up"]])
-    notHitCount = len(_fiveData) - hitCount
-    achievements = [
-        {
-            "title": "",
-            "info": "",
-            "achievedTime": "小保底歪的概率",
-            "value": f"{notHitCount} / {hitCount}",
-        }
-    ]
-    if notHitCount == 0:
-        achievements[0]["title"] = "「不倒翁」"
-        achievements[0]["info"] = "在「角色活动祈愿」中抽中的五星角色均为当期 UP 角色"
-    if hitCount > notHitCount:
-        achievements[0]["title"] = "「晴时总比雨时多」"
-        achievements[0]["info"] = "在「角色活动祈愿」中，小保底偏向于抽中当期 UP 角色"
-    if hitCount == notHitCount:
-        achievements[0]["title"] = "「晴雨各半」"
-        achievements[0]["info"] = "在「角色活动祈愿」中小保底歪与不歪次数持平"
-    if hitCount < notHitCount:
-        achievements[0]["title"] = "「雨时偏比晴时多」"
-        achievements[0]["info"] = "在「角色活动祈愿」中，小保底偏向于没有抽中当期 UP 角色"
 
-    return achievements
+@achievement
+class GachaWrongUp(AchievementRule):
+    """角色活动祈愿限定 UP 成就"""
 
+    def __init__(self) -> None:
+        self.hit, self.notHit = 0, 0
 
-@run_sync
-def gachaMaxDay(logsData: Dict[str, List[Dict]]) -> List[Dict[str, str]]:
-    """单日抽卡次数极多成就"""
+    def onRecord(self, timeStr: str, drop: Dict) -> None:
+        if drop["pool"] == "301" and drop["rank"] == 5:
+            if drop["up"]:
+                self.hit += 1
+            else:
+                self.notHit += 1
 
-    days, achievements = {}, []
-    for timeStr, logs in logsData.items():
-        idx = timeStr.split()[0]
-        _day = days.get(idx, {})
-        days[idx] = {
-            "count": _day.get("count", 0) + len(logs),
-            "five": _day.get("five", []) + [x for x in logs if x["rank"] == 5],
-        }
+    def result(self) -> List[Dict[str, str]]:
+        if not self.hit + self.notHit:
+            return []
 
-    days = dict(sorted(days.items(), key=lambda x: x[1]["count"]))
-    dayIdx = list(days.keys())[-1]
-    dayDisplay = dayIdx.replace("-", "/")
-    if not days[dayIdx]["five"]:
-        achievements.append(
+        hitCount, notHitCount = self.hit, self.notHit
+        achievements = [
             {
-                "title": "「最黑暗的一天」",
-                "info": f"在 {dayDisplay} 这一天，你共抽取了 {days[dayIdx]['count']} 次，然而并没有出金",
-                "achievedTime": dayDisplay,
-                "value": "达成",
+                "title": "",
+                "info": "",
+                "achievedTime": "小保底歪的概率",
+                "value": f"{notHitCount} / {hitCount}",
             }
-        )
-    else:
-        _five = [i["name"] for i in days[dayIdx]["five"]]
-        achievements.append(
+        ]
+        if notHitCount == 0:
+            achievements[0]["title"] = "「不倒翁」"
+            achievements[0]["info"] = "在「角色活动祈愿」中抽中的五星角色均为当期 UP 角色"
+        if hitCount > notHitCount:
+            achievements[0]["title"] = "「晴时总比雨时多」"
+            achievements[0]["info"] = "在「角色活动祈愿」中，小保底偏向于抽中当期 UP 角色"
+        if hitCount == notHitCount:
+            achievements[0]["title"] = "「晴雨各半」"
+            achievements[0]["info"] = "在「角色活动祈愿」中小保底歪与不歪次数持平"
+        if hitCount < notHitCount:
+            achievements[0]["title"] = "「雨时偏比晴时多」"
+            achievements[0]["info"] = "在「角色活动祈愿」中，小保底偏向于没有抽中当期 UP 角色"
+
+        return achievements
+
+
+@achievement
+class GachaMaxDay(AchievementRule):
+    """单日抽卡次数极多成就"""
+
+    def __init__(self) -> None:
+        self.days: Dict[str, Dict] = {}
+
+    def onGroup(self, timeStr: str, drops: Tuple[Dict, ...]) -> None:
+        _day = self.days.setdefault(timeStr.split()[0], {"count": 0, "five": []})
+        _day["count"] += len(drops)
+        _day["five"].extend(x["name"] for x in drops if x["rank"] == 5)
+
+    def result(self) -> List[Dict[str, str]]:
+        if not self.days:
+            return []
+        days = dict(sorted(self.days.items(), key=lambda x: x[1]["count"]))
+        dayIdx = list(days.keys())[-1]
+        dayDisplay = dayIdx.replace("-", "/")
+        if not days[dayIdx]["five"]:
+            return [
+                {
+                    "title": "「最黑暗的一天」",
+                    "info": f"在 {dayDisplay} 这一天，你共抽取了 {days[dayIdx]['count']} 次，然而并没有出金",  # noqa: E501
+                    "achievedTime": dayDisplay,
+                    "value": "达成",
+                }
+            ]
+        _five = days[dayIdx]["five"]
+        return [
             {
                 "title": "「豪掷千金」",
                 "info": "在 {} 这一天，你共抽取了 {} 次。在抽到{}时，你有没有很开心呢？".format(
@@ -236,72 +249,88 @@ def gachaMaxDay(logsData: Dict[str, List[Dict]]) -> List[Dict[str, str]]:
                 "achievedTime": dayDisplay,
                 "value": "达成",
             }
-        )
-
-    return achievements
+        ]
 
 
-@run_sync
-def gachaHamster(logsData: Dict[str, List[Dict]]) -> List[Dict[str, str]]:
+@achievement
+class GachaHamster(AchievementRule):
     """未抽卡持续天数极长成就"""
 
-    times = []
-    for timeStr, logs in logsData.items():
-        if len([x for x in logs if x["pool"] in ["301", "302"]]):
-            times.append(timeStr)
-
-    # 转换 datatime 对象
-    datetimes = [datetime_with_tz(time) for time in times]
-    # 计算最大差值、起点和终点
-    diff, start, end = max((b - a, a, b) for a, b in zip(datetimes, datetimes[1:]))
-    # 格式化字符串
-    fromTo = f"{start:%Y/%m/%d} 到 {end:%Y/%m/%d}"
-    duration = f"{diff.days} 天 {diff.seconds // 3600} 时"
-
-    if diff.days <= 15:
-        level, info = "随缘", "是一只不太合格的仓鼠呢~"
-    elif diff.days <= 30:
-        level, info = "合格", "你已经是一只合格的仓鼠了"
-    elif diff.days <= 60:
-        level, info = "专家", "作为仓鼠，你就是专家！"
-    else:
-        level, info = "大师", "您的传说受到了众仓鼠的景仰！"
-
-    return [
-        {
-            "title": f"「{level}仓鼠」",
-            "info": f"{fromTo} 期间没有使用「纠缠之缘」进行抽卡。{info}",
-            "achievedTime": "持续时间",
-            "value": duration,
-        }
-    ]
+    def __init__(self) -> None:
+        # 最大间隔秒数、起点和终点，以及上一次在活动祈愿中抽卡的时间
+        self.diff, self.start, self.end = -1, 0, 0
+        self.last = 0
+
+    def onGroup(self, timeStr: str, drops: Tuple[Dict, ...]) -> None:
+        if not any(x["pool"] in ["301", "302"] for x in drops):
+            return
+        timestamp = timestamp_with_tz(timeStr)
+        if self.last:
+            self.diff, self.start, self.end = max(
+                (self.diff, self.start, self.end),
+                (timestamp - self.last, self.last, timestamp),
+            )
+        self.last = timestamp
+
+    def result(self) -> List[Dict[str, str]]:
+        if self.diff < 0:
+            return []
+        days = self.diff // 86400
+        # 格式化字符串
+        fromTo = "{:%Y/%m/%d} 到 {:%Y/%m/%d}".format(
+            datetime_with_tz(self.start), datetime_with_tz(self.end)
+        )
+        duration = f"{days} 天 {self.diff % 86400 // 3600} 时"
+
+        if days <= 15:
+            level, info = "随缘", "是一只不太合格的仓鼠呢~"
+        elif days <= 30:
+            level, info = "合格", "你已经是一只合格的仓鼠了"
+        elif days <= 60:
+            level, info = "专家", "作为仓鼠，你就是专家！"
+        else:
+            level, info = "大师", "您的传说受到了众仓鼠的景仰！"
+
+        return [
+            {
+                "title": f"「{level}仓鼠」",
+                "info": f"{fromTo} 期间没有使用「纠缠之缘」进行抽卡。{info}",
+                "achievedTime": "持续时间",
+                "value": duration,
+            }
+        ]
 
 
-@run_sync
-def gachaTogether(logsData: Dict[str, List[Dict]]) -> List[Dict[str, str]]:
+@achievement
+class GachaTogether(AchievementRule):
     """十连相关成就"""
+
     # 「单抽/十连出奇迹」在 LIMIT 抽内获取五星
     # 「N黄蛋！」在一次十连中，抽取到了 N 个五星
     # 「四叶草」在一次十连中，抽取到 4 个或以上的四或五星
     # 「这才是角色池！」在一次十连中，抽出的角色不少于武器
-
-    achievements = []
-    miracle, yolk, realChar, manyGood = {"single": 0, "ten": 0}, {}, {}, {}
     miracleLimit, miraclePct = 40, 0.3
 
-    for timeStr, logs in logsData.items():
+    def __init__(self) -> None:
+        self.miracle = {"single": 0, "ten": 0}
+        self.yolk: Dict[str, Dict] = {}
+        self.realChar = {"count": 0, "first": "", "char": 0}
+        self.manyGood: Dict[str, Dict] = {}
+
+    def onGroup(self, timeStr: str, drops: Tuple[Dict, ...]) -> None:
+        miracle, yolk, manyGood = self.miracle, self.yolk, self.manyGood
         # 单抽
-        if len(logs) == 1:
+        if len(drops) == 1:
             # 「单抽出奇迹」
-            if logs[0]["rank"] == 5 and logs[0]["pity"] <= miracleLimit:
+            if drops[0]["rank"] == 5 and drops[0]["pity"] <= self.miracleLimit:
                 miracle["single"] += 1
-        elif len(logs) == 10:
-            _charCnt = len([x for x in logs if x["type"] == "角色"])
-            _fourCnt = len([x for x in logs if x["rank"] == 4])
-            _fiveCnt = len([x for x in logs if x["rank"] == 5])
+        elif len(drops) == 10:
+            _charCnt = len([x for x in drops if x["type"] == "角色"])
+            _fourCnt = len([x for x in drops if x["rank"] == 4])
+            _fiveCnt = len([x for x in drops if x["rank"] == 5])
             # 「十连出奇迹」
             miracle["ten"] += len(
-                [x for x in logs if x["rank"] == 5 and x["pity"] <= miracleLimit]
+                [x for x in drops if x["rank"] == 5 and x["pity"] <= self.miracleLimit]
             )
             # 「N黄蛋！」
             if _fiveCnt > 1:
@@ -311,7 +340,9 @@ def gachaTogether(logsData: Dict[str, List[Dict]]) -> List[Dict[str, str]]:
                 }
             # 「这才是角色池！」
             if _charCnt >= 5:
-                realChar[timeStr] = _charCnt
+                self.realChar["count"] += 1
+                if not self.realChar["first"]:
+                    self.realChar["first"], self.realChar["char"] = timeStr, _charCnt
             # 「四叶草」「福至五彩」等
             elif _fiveCnt + _fourCnt >= 4:
                 manyGoodKey = str(_fiveCnt + _fourCnt)
@@ -320,124 +351,320 @@ def gachaTogether(logsData: Dict[str, List[Dict]]) -> List[Dict[str, str]]:
                     "first": manyGood.get(manyGoodKey, {}).get("first") or timeStr,
                 }
 
-    if miracle["single"] + miracle["ten"]:
-        _str = "、".join(
-            f"通过{'十连' if k == 'ten' else '单抽'}获取 {v} 次" for k, v in miracle.items() if v
+    def result(self) -> List[Dict[str, str]]:
+        achievements = []
+        miracle, yolk, realChar, manyGood = (
+            self.miracle,
+            self.yolk,
+            self.realChar,
+            self.manyGood,
         )
-        _achievement = {
-            "title": "「单抽出奇迹？」",
-            "info": "在 {} 抽内获取五星共计 {} 次，其中{}".format(
-                miracleLimit, miracle["single"] + miracle["ten"], _str
-            ),
-        }
-        if miracle["ten"] and miracle["single"] / miracle["ten"] < miraclePct:
-            _achievement["title"] = "「十连出奇迹！」"
-        if miracle["single"] and miracle["ten"] / miracle["single"] < miraclePct:
-            _achievement["title"] = "「单抽出奇迹！」"
-        achievements.append(_achievement)
-
-    if yolk:
-        _map = ["双", "三", "四", "五", "六", "七", "八", "九", "十"]
-        achievements.extend(
-            [
+
+        if miracle["single"] + miracle["ten"]:
+            _str = "、".join(
+                f"通过{'十连' if k == 'ten' else '单抽'}获取 {v} 次"
+                for k, v in miracle.items()
+                if v
+            )
+            _achievement = {
+                "title": "「单抽出奇迹？」",
+                "info": "在 {} 抽内获取五星共计 {} 次，其中{}".format(
+                    self.miracleLimit, miracle["single"] + miracle["ten"], _str
+                ),
+            }
+            if miracle["ten"] and miracle["single"] / miracle["ten"] < self.miraclePct:
+                _achievement["title"] = "「十连出奇迹！」"
+            if (
+                miracle["single"]
+                and miracle["ten"] / miracle["single"] < self.miraclePct
+            ):
+                _achievement["title"] = "「单抽出奇迹！」"
+            achievements.append(_achievement)
+
+        if yolk:
+            _map = ["双", "三", "四", "五", "六", "七", "八", "九", "十"]
+            achievements.extend(
+                [
+                    {
+                        "title": f"「{_map[int(k) - 2]}黄蛋！」",
+                        "info": f"在一次十连中，你抽取到了 {k} 个五星{'，你就是极致的欧皇！' if int(k) > 2 else ''}",  # noqa: E501
+                        "achievedTime": v["first"].split()[0].replace("-", "/"),
+                        "value": "达成" if v["count"] == 1 else f"总计 {v['count']}",
+                    }
+                    for k, v in yolk.items()
+                ]
+            )
+
+        if manyGood:
+            _map = ["四叶草", "福至五彩", "六六顺意", "七星高照", "八方鸿运", "九九同心", "十全十美"]
+            achievements.extend(
+                [
+                    {
+                        "title": f"「{_map[int(k) - 4]}」",
+                        "info": "在一次十连中，你抽取到了 {} 个四星或五星{}".format(
+                            k, "，这何尝不是另类的欧皇！" if int(k) > 4 else ""
+                        ),
+                        "achievedTime": v["first"].split()[0].replace("-", "/"),
+                        "value": "达成" if v["count"] == 1 else f"总计 {v['count']}",
+                    }
+                    for k, v in manyGood.items()
+                ]
+            )
+
+        if realChar["count"]:
+            achievements.append(
                 {
-                    "title": f"「{_map[int(k) - 2]}黄蛋！」",
-                    "info": f"在一次十连中，你抽取到了 {k} 个五星{'，你就是极致的欧皇！' if int(k) > 2 else ''}",
-                    "achievedTime": v["first"].split()[0].replace("-", "/"),
-                    "value": "达成" if v["count"] == 1 else f"总计 {v['count']}",
+                    "title": "「这才是角色池！」",
+                    "info": "在一次十连中，抽出的角色不少于武器",
+                    "achievedTime": realChar["first"].split()[0].replace("-", "/"),
+                    "value": f"总计 {realChar['count']}"
+                    if realChar["count"] > 1
+                    else f"角色 {realChar['char']}",
                 }
-                for k, v in yolk.items()
-            ]
-        )
+            )
+
+        return achievements
+
 
-    if manyGood:
-        _map = ["四叶草", "福至五彩", "六六顺意", "七星高照", "八方鸿运", "九九同心", "十全十美"]
-        achievements.extend(
-            [
+@achievement
+class GachaMostChar(AchievementRule):
+    """获取最多角色成就"""
+
+    def __init__(self) -> None:
+        # 各星级角色获取次数及首次获取的卡池序号、时间和位置
+        self.chars: Dict[str, Dict[str, List]] = {"5": {}, "4": {}}
+
+    def onGroup(self, timeStr: str, drops: Tuple[Dict, ...]) -> None:
+        for idx, drop in enumerate(drops):
+            if drop["type"] != "角色" or drop["rank"] < 4:
+                continue
+            chars = self.chars[str(drop["rank"])]
+            first = [RENDER_ORDER.index(drop["pool"]), timeStr, idx]
+            if drop["name"] not in chars:
+                chars[drop["name"]] = [1, *first]
+            else:
+                char = chars[drop["name"]]
+                char[0] += 1
+                char[1:] = min(char[1:], first)
+
+    def result(self) -> List[Dict[str, str]]:
+        achievements = []
+        # 按首次获取的先后排列，与逐个卡池遍历的结果一致
+        mostFive, mostFour = (
+            dict(
+                sorted(
+                    ((k, v[0]) for k, v in sorted(c.items(), key=lambda x: x[1][1:])),
+                    key=lambda x: x[1],
+                )
+            )
+            for c in (self.chars["5"], self.chars["4"])
+        )
+        if mostFive and mostFive[list(mostFive.keys())[-1]] > 1:
+            count = mostFive[list(mostFive.keys())[-1]]
+            names = [k for k, v in mostFive.items() if v == count for _ in range(v)]
+            multi = "他们" if len(Counter(names).keys()) > 1 else " ta "
+            achievements.append(
                 {
-                    "title": f"「{_map[int(k) - 4]}」",
-                    "info": "在一次十连中，你抽取到了 {} 个四星或五星{}".format(
-                        k, "，这何尝不是另类的欧皇！" if int(k) > 4 else ""
-                    ),
-                    "achievedTime": v["first"].split()[0].replace("-", "/"),
-                    "value": "达成" if v["count"] == 1 else f"总计 {v['count']}",
+                    "title": "「情有独钟(五星角色)」",
+                    "info": f"你共抽取了{mergeItemStr(names)}，这是上天对你的眷顾还是你对{multi}的情有独钟呢？",
                 }
-                for k, v in manyGood.items()
-            ]
-        )
+            )
+        if mostFour and mostFour[list(mostFour.keys())[-1]] > 1:
+            count = mostFour[list(mostFour.keys())[-1]]
+            names = [k for k, v in mostFour.items() if v == count for _ in range(v)]
+            multi = "他们" if len(Counter(names).keys()) > 1 else " ta "
+            achievements.append(
+                {
+                    "title": "「情有独钟(四星角色)」",
+                    "info": f"你共抽取了{mergeItemStr(names)}，这是上天对你的眷顾还是你对{multi}的情有独钟呢？",
+                }
+            )
 
-    if realChar:
-        achievements.append(
-            {
-                "title": "「这才是角色池！」",
-                "info": "在一次十连中，抽出的角色不少于武器",
-                "achievedTime": list(realChar.keys())[0].split()[0].replace("-", "/"),
-                "value": f"总计 {len(realChar.keys())}"
-                if len(realChar.keys()) > 1
-                else f"角色 {list(realChar.values())[0]}",
-            }
-        )
+        return achievements
 
-    return achievements
 
+# 成就摘要格式版本，规则累积状态变更时递增以重建全部摘要
+ACHIEVE_VERSION = 1
 
-@run_sync
-def gachaMostChar(allData: Dict[str, Dict[str, int]]) -> List[Dict[str, str]]:
-    """获取最多角色成就"""
 
-    achievements = []
-    mostFive = dict(sorted(allData["5-角色"].items(), key=lambda x: x[1]))
-    mostFour = dict(sorted(allData["4-角色"].items(), key=lambda x: x[1]))
-    if mostFive and mostFive[list(mostFive.keys())[-1]] > 1:
-        count = mostFive[list(mostFive.keys())[-1]]
-        names = [k for k, v in mostFive.items() if v == count for _ in range(v)]
-        multi = "他们" if len(Counter(names).keys()) > 1 else " ta "
-        achievements.append(
-            {
-                "title": "「情有独钟(五星角色)」",
-                "info": f"你共抽取了{mergeItemStr(names)}，这是上天对你的眷顾还是你对{multi}的情有独钟呢？",
-            }
-        )
-    if mostFour and mostFour[list(mostFour.keys())[-1]] > 1:
-        count = mostFour[list(mostFour.keys())[-1]]
-        names = [k for k, v in mostFour.items() if v == count for _ in range(v)]
-        multi = "他们" if len(Counter(names).keys()) > 1 else " ta "
-        achievements.append(
-            {
-                "title": "「情有独钟(四星角色)」",
-                "info": f"你共抽取了{mergeItemStr(names)}，这是上天对你的眷顾还是你对{multi}的情有独钟呢？",
-            }
-        )
+def gnrtDrops(banner: str, items: List[Dict], pity: int) -> Tuple[List[Tuple], int]:
+    """
+    生成成就规则所需的精简记录，五星记录附带保底内抽数及是否为 UP 物品
+
+    * ``param banner: str`` 卡池类型
+    * ``param items: List[Dict]`` 抽卡记录，从旧到新排列
+    * ``param pity: int`` 首条记录之前的保底内抽数
+    - ``return: Tuple[List[Tuple], int]`` 抽卡时间与精简记录、最后一条记录之后的保底内抽数
+    """  # noqa: E501
+
+    drops = []
+    for item in items:
+        pity += 1
+        rankType = int(item["rank_type"])
+        drop = {
+            "pool": banner,
+            "name": item["name"],
+            "rank": rankType,
+            "type": item["item_type"],
+        }
+        if rankType == 5:
+            drop["pity"], pity = pity, 0
+            # 成就沿用首个匹配的卡池，UP 判断异常已在统计时记录
+            if banner in ["301", "302"]:
+                belongTo = getPoolUp(
+                    item["gacha_type"], timestamp_with_tz(item["time"])
+                )
+                drop["up"] = bool(belongTo) and item["name"] in belongTo[0].orange
+        drops.append((item["time"], drop))
+    return drops, pity
+
+
+def feedRules(rules: List[AchievementRule], drops: List[List[Tuple]]) -> None:
+    """
+    按时间顺序合并各卡池记录，依次分发至订阅事件的成就规则
+
+    * ``param rules: List[AchievementRule]`` 成就规则，原地更新累积状态
+    * ``param drops: List[List[Tuple]]`` 各卡池的精简记录，由 ``gnrtDrops()`` 生成
+    """
+
+    onGroup = [
+        r.onGroup for r in rules if type(r).onGroup is not AchievementRule.onGroup
+    ]
+    onRecord = [
+        r.onRecord for r in rules if type(r).onRecord is not AchievementRule.onRecord
+    ]
+    # 同一时间的记录按卡池顺序排列，时间字符串可直接比较先后
+    for timeStr, group in groupby(merge(*drops, key=itemgetter(0)), itemgetter(0)):
+        _drops = tuple(drop for _, drop in group)
+        for handler in onGroup:
+            handler(timeStr, _drops)
+        for drop in _drops if onRecord else ():
+            for handler in onRecord:
+                handler(timeStr, drop)
+
+
+def foldAchieve(
+    gachaLogs: Dict[str, List[Dict]], summary: Dict
+) -> Tuple[Dict, List[AchievementRule], bool]:
+    """
+    在成就摘要基础上计入新增记录，检查点与记录不符、新增记录早于已计入记录或卡池信息更新时从头重建
+
+    * ``param gachaLogs: Dict[str, List[Dict]]`` 抽卡记录数据，各卡池记录从新到旧排列
+    * ``param summary: Dict`` 成就摘要，由 ``loadSummary()`` 读取
+    - ``return: Tuple[Dict, List[AchievementRule], bool]`` 新的成就摘要、成就规则、摘要是否有变更
+    """  # noqa: E501
+
+    oldRules: Dict[str, Dict[str, Any]] = summary.get("rules", {})
+    # 规则状态中的 UP 判断依赖卡池信息，卡池信息更新后同样从头重建
+    rebuild = (
+        summary.get("version") != ACHIEVE_VERSION
+        or summary.get("pools") != POOL_DIGEST
+        or set(oldRules) != {rule.__name__ for rule in ACHIEVEMENT_RULES}
+    )
+    oldMarks: Dict = {} if rebuild else summary.get("marks", {})
+    deltas: Dict[str, Tuple[List[Dict], int]] = {}
+    for banner in RENDER_ORDER:
+        gachaList = gachaLogs.get(banner)
+        if not gachaList:
+            rebuild = rebuild or banner in oldMarks
+            continue
+        old, total = oldMarks.get(banner), len(gachaList)
+        folded = old["total"] if old else 0
+        if (
+            old
+            and 0 < folded <= total
+            and old["first"] == recordMark(gachaList[-1])
+            and old["last"] == recordMark(gachaList[total - folded])
+        ):
+            # 新增记录总是位于列表最前
+            deltas[banner] = (gachaList[: total - folded], old["pity"])
+        else:
+            rebuild = rebuild or bool(old)
+            deltas[banner] = (gachaList, 0)
+    # 规则按时间顺序累积，新增记录须晚于全部已计入记录
+    rebuild = rebuild or any(
+        delta[-1]["time"] <= summary.get("last", "")
+        for delta, _ in deltas.values()
+        if delta
+    )
+    if rebuild:
+        deltas = {banner: (gachaLogs[banner], 0) for banner in deltas}
+
+    rules = [rule() for rule in ACHIEVEMENT_RULES]
+    if not rebuild:
+        for rule in rules:
+            rule.__dict__.update(oldRules[type(rule).__name__])
+    marks, drops = {}, []
+    for banner, (delta, pity) in deltas.items():
+        bannerDrops, pity = gnrtDrops(banner, delta[::-1], pity)
+        drops.append(bannerDrops)
+        gachaList = gachaLogs[banner]
+        marks[banner] = {
+            "first": recordMark(gachaList[-1]),
+            "last": recordMark(gachaList[0]),
+            "total": len(gachaList),
+            "pity": pity,
+        }
+    feedRules(rules, drops)
+
+    count = sum(len(d) for d in drops)
+    if count:
+        logger.debug(f"成就摘要计入 {count} 条记录")
+    return (
+        {
+            "version": ACHIEVE_VERSION,
+            "pools": POOL_DIGEST,
+            "marks": marks,
+            "last": max((gachaLogs[b][0]["time"] for b in marks), default=""),
+            "rules": {type(rule).__name__: vars(rule) for rule in rules},
+        },
+        rules,
+        rebuild or bool(count),
+    )
+
+
+def calcSummaryAchieve(
+    uid: str, gachaLogs: Dict[str, List[Dict]], save: bool = False
+) -> List[Dict[str, str]]:
+    """
+    基于本地成就摘要计算成就，仅需计入摘要之后的新增记录
+
+    * ``param uid: str`` 抽卡记录所属 UID
+    * ``param gachaLogs: Dict[str, List[Dict]]`` 抽卡记录数据，各卡池记录从新到旧排列
+    * ``param save: bool = False`` 是否保存更新后的摘要，仅应在记录写入本地时启用
+    - ``return: List[Dict[str, str]]`` 成就数据，按规则注册顺序排列
+    """  # noqa: E501
 
+    summary, rules, changed = foldAchieve(gachaLogs, loadSummary(uid, "gachaachieve"))
+    if save and changed:
+        saveSummary(uid, summary, "gachaachieve")
+
+    # 单个规则出错不影响其余成就
+    achievements = []
+    for rule in rules:
+        try:
+            achievements.extend(rule.result())
+        except Exception as e:
+            logger.opt(exception=e).error(f"成就 {type(rule).__name__} 计算出错")
     return achievements
 
 
-async def calcAchievement(rawData: Dict) -> Tuple[str, List[Dict[str, str]]]:
+async def calcAchievement(uid: str, rawData: Dict) -> Tuple[str, List[Dict[str, str]]]:
     """
-    成就数据提取
+    成就数据提取，不会修改本地成就摘要
 
+    * ``param uid: str`` 抽卡记录所属 UID
     * ``param rawData: Dict`` 抽卡记录数据
     - ``return: Tuple[str, List[Dict[str, str]]]`` 记录范围、成就数据
     """
 
-    analysis = await getLogsAnalysis(rawData)
-
-    times = list(analysis["logs"].keys())
-    total = sum(sum(n for _, n in d.items()) for _, d in analysis["all"].items())
+    gachaLists = [rawData[b] for b in RENDER_ORDER if rawData.get(b)]
+    start = min(gachaList[-1]["time"] for gachaList in gachaLists)
+    end = max(gachaList[0]["time"] for gachaList in gachaLists)
     scope = "{} 共 {} 抽".format(
-        f"{times[0]} ~ {times[-1]}" if len(times) > 1 else f"{times[0]}", total
+        f"{start} ~ {end}" if start != end else start, sum(len(g) for g in gachaLists)
     )
 
-    tasks = [
-        gachaPityLimit(analysis["five"]),
-        gachaNotExist(analysis["null"]),
-        gachaWrongUp(analysis["five"]),
-        gachaMaxDay(analysis["logs"]),
-        gachaHamster(analysis["logs"]),
-        gachaTogether(analysis["logs"]),
-        gachaMostChar(analysis["all"]),
-    ]
-    calcRes = await asyncio.gather(*tasks)
-    achievements = [item for subList in calcRes for item in subList]
+    achievements = await run_sync(calcSummaryAchieve)(uid, rawData)
 
     return scope, achievements
@@ -0,0 +1,369 @@
+import json
+from operator import itemgetter
+from typing import Any, Dict, List, Tuple, Optional
+
+from nonebot.log import logger
+from nonebot.utils import run_sync
+
+from .__meta__ import (
+    LOCAL_DIR,
+    GACHA_TYPE,
+    POOL_INDEX,
+    POOL_DIGEST,
+    NUMPY_THRESHOLD,
+    PoolUp,
+    getPoolUp,
+    timestamp_with_tz,
+)
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# 重排顺序为 301 302 200 100（角色、武器、常驻、新手
+RENDER_ORDER = sorted(GACHA_TYPE.keys(), key=lambda k: k[0], reverse=True)
+
+# 统计摘要格式版本，格式变更时递增以重建全部摘要
+SUMMARY_VERSION = 1
+
+
+def newStat() -> Dict[str, Any]:
+    """生成空白的卡池统计数据"""
+
+    return {
+        "total": 0,  # 总抽数
+        "cntNot5": 0,  # 未出五星抽数，即当前保底内抽数
+        "cntStar3": 0,  # 三星物品总数
+        "cntChar4": 0,  # 四星角色总数
+        "cntWeapon4": 0,  # 四星武器总数
+        "cntChar5": 0,  # 五星角色总数
+        "cntWeapon5": 0,  # 五星武器总数
+        "star5": [],  # 五星物品列表
+        "startTime": "",  # 抽卡记录开始时间
+        "endTime": "",  # 抽卡记录结束时间
+    }
+
+
+def matchPoolUp(banner: str, item: Dict) -> List[PoolUp]:
+    """
+    查找记录所属的 UP 卡池，匹配结果为空或不唯一时记录错误日志
+
+    * ``param banner: str`` 卡池类型
+    * ``param item: Dict`` 抽卡记录
+    - ``return: List[PoolUp]`` 匹配的卡池
+    """
+
+    belongTo = getPoolUp(item["gacha_type"], timestamp_with_tz(item["time"]))
+    if not belongTo or len(belongTo) > 1:
+        logger.error(
+            "卡池 {} 异常的 UP 判断：{}({}) in {}".format(
+                banner,
+                item["name"],
+                item["time"],
+                "/".join(bp.name for bp in belongTo) if belongTo else "null",
+            )
+        )
+    return belongTo
+
+
+def countUp(gachaStat: Dict[str, Any], itemName: str, belongTo: List[PoolUp]) -> bool:
+    """
+    计入 UP 物品总数，仅在匹配的卡池唯一时计入
+
+    * ``param gachaStat: Dict[str, Any]`` 卡池统计数据，原地更新
+    * ``param itemName: str`` 物品名称
+    * ``param belongTo: List[PoolUp]`` 匹配的卡池，由 ``matchPoolUp()`` 返回
+    - ``return: bool`` 是否为 UP 五星物品
+    """
+
+    if len(belongTo) != 1:
+        return False
+    if itemName in belongTo[0].purple:
+        gachaStat["cntUp4"] = 1 + gachaStat.get("cntUp4", 0)
+    elif itemName in belongTo[0].orange:
+        gachaStat["cntUp5"] = 1 + gachaStat.get("cntUp5", 0)
+        return True
+    return False
+
+
+def foldStat(
+    gachaStat: Dict[str, Any], banner: str, item: Dict
+) -> Optional[List[PoolUp]]:
+    """
+    将单条记录计入卡池统计数据，记录须从旧到新依次计入
+
+    * ``param gachaStat: Dict[str, Any]`` 卡池统计数据，由 ``newStat()`` 生成，原地更新
+    * ``param banner: str`` 卡池类型
+    * ``param item: Dict`` 抽卡记录
+    - ``return: Optional[List[PoolUp]]`` UP 判断匹配的卡池，未进行 UP 判断时返回 ``None``
+    """  # noqa: E501
+
+    gachaStat["total"] += 1  # 总抽数递增
+    gachaStat["cntNot5"] += 1  # 保底计数器递增
+    gachaStat["startTime"] = gachaStat["startTime"] or item["time"]
+    gachaStat["endTime"] = item["time"]
+    rankType = int(item["rank_type"])
+    if rankType == 3:
+        gachaStat["cntStar3"] += 1  # 三星物品总数递增
+        return None
+    itemName = item["name"]
+    t = "cntChar" if item["item_type"] == "角色" else "cntWeapon"
+    gachaStat[t + str(rankType)] += 1  # 对应星级对应类型物品总数递增
+
+    # 对应星级对应类型物品 UP 总数递增
+    belongTo, gotUpStar5 = None, False
+    if banner in ["301", "302"]:
+        belongTo = matchPoolUp(banner, item)
+        gotUpStar5 = countUp(gachaStat, itemName, belongTo)
+
+    if rankType == 5:
+        gachaStat["star5"].append(
+            {"name": itemName, "count": gachaStat["cntNot5"], "up": gotUpStar5}
+        )
+        gachaStat["cntNot5"] = 0  # 重置保底计数器
+    return belongTo
+
+
+def calcPity(gachaLogs: Dict[str, List[Dict]]) -> Dict[str, Tuple[int, ...]]:
+    """
+    各卡池每条记录的保底内抽数，五星记录为出货时的抽数，其余记录为此时保底内已抽数
+
+    * ``param gachaLogs: Dict[str, List[Dict]]`` 抽卡记录数据，各卡池记录从新到旧排列
+    - ``return: Dict[str, Tuple[int, ...]]`` 各卡池每条记录的保底内抽数，从最旧的记录开始，仅包含有记录的卡池
+    """  # noqa: E501
+
+    pity = {}
+    for banner in RENDER_ORDER:
+        gachaList = gachaLogs.get(banner)
+        if not gachaList:
+            continue
+        pitySeries, cntNot5 = [], 0
+        for item in reversed(gachaList):
+            cntNot5 += 1
+            pitySeries.append(cntNot5)
+            if int(item["rank_type"]) == 5:
+                cntNot5 = 0
+        pity[banner] = tuple(pitySeries)
+    return pity
+
+
+def matchPoolUpArray(banner: str, items: List[Dict]) -> List[List[PoolUp]]:
+    """
+    批量查找记录所属的 UP 卡池，时间区间无重叠的记录向量化查找，其余记录逐条查找
+
+    * ``param banner: str`` 卡池类型
+    * ``param items: List[Dict]`` 抽卡记录
+    - ``return: List[List[PoolUp]]`` 各记录匹配的卡池，与 ``matchPoolUp()`` 结果一致
+    """  # noqa: E501
+
+    matched: List[List[PoolUp]] = [[] for _ in items]
+    gachaTypes = [item["gacha_type"] for item in items]
+    for gachaType in set(gachaTypes):
+        rows = [i for i, t in enumerate(gachaTypes) if t == gachaType]
+        idx = POOL_INDEX.get(int(gachaType))
+        if not idx:
+            for i in rows:
+                matched[i] = matchPoolUp(banner, items[i])
+            continue
+        ends, maxEnds = np.asarray(idx.ends), np.asarray(idx.maxEnds)
+        ts = np.fromiter(
+            (timestamp_with_tz(items[i]["time"]) for i in rows), np.float64, len(rows)
+        )
+        # 开始时间不晚于记录的最后一个卡池覆盖记录，且更早的卡池均已结束时结果唯一
+        pos = np.searchsorted(np.asarray(idx.starts), ts, side="right") - 1
+        last = np.maximum(pos, 0)
+        unique = (
+            (pos >= 0)
+            & (ends[last] >= ts)
+            & ((pos < 1) | (maxEnds[np.maximum(pos - 1, 0)] < ts))
+        )
+        for i, isUnique, p in zip(rows, unique.tolist(), pos.tolist()):
+            matched[i] = [idx.pools[p]] if isUnique else matchPoolUp(banner, items[i])
+    return matched
+
+
+def calcStatArray(banner: str, items: List[Dict]) -> Dict[str, Any]:
+    """
+    NumPy 向量化卡池统计，结果与逐条 ``foldStat()`` 一致
+
+    * ``param banner: str`` 卡池类型
+    * ``param items: List[Dict]`` 抽卡记录，从旧到新排列
+    - ``return: Dict[str, Any]`` 卡池统计数据
+    """
+
+    total = len(items)
+    rankCol = list(map(itemgetter("rank_type"), items))
+    rankStr = "".join(rankCol)
+    if len(rankStr) == total and rankStr.isdigit() and rankStr.isascii():
+        # 星级均为一位数字时直接按字节转换
+        rank = np.frombuffer(rankStr.encode(), np.uint8).astype(np.int8) - 48
+    else:
+        rank = np.fromiter(map(int, rankCol), np.int8, total)
+    isChar = np.fromiter(
+        map("角色".__eq__, map(itemgetter("item_type"), items)), np.bool_, total
+    )
+    # 保底内抽数为序号减去此前最后一个五星的序号
+    order = np.arange(1, total + 1)
+    lastFive = np.maximum.accumulate(np.where(rank == 5, order, 0))
+    pity = order - np.concatenate(([0], lastFive[:-1]))
+
+    gachaStat = newStat()
+    gachaStat.update(
+        {
+            "total": total,
+            "cntNot5": int(total - lastFive[-1]),
+            "cntStar3": int(np.count_nonzero(rank == 3)),
+            "cntChar4": int(np.count_nonzero((rank == 4) & isChar)),
+            "cntWeapon4": int(np.count_nonzero((rank == 4) & ~isChar)),
+            "cntChar5": int(np.count_nonzero((rank == 5) & isChar)),
+            "cntWeapon5": int(np.count_nonzero((rank == 5) & ~isChar)),
+            "startTime": items[0]["time"],
+            "endTime": items[-1]["time"],
+        }
+    )
+    belongs, gotUp = {}, {}
+    if banner in ["301", "302"]:
+        rows = np.flatnonzero(rank >= 4).tolist()
+        belongs = dict(zip(rows, matchPoolUpArray(banner, [items[i] for i in rows])))
+        for i, belongTo in belongs.items():
+            gotUp[i] = countUp(gachaStat, items[i]["name"], belongTo)
+    gachaStat["star5"] = [
+        {"name": items[i]["name"], "count": int(pity[i]), "up": gotUp.get(i, False)}
+        for i in np.flatnonzero(rank == 5).tolist()
+    ]
+    return gachaStat
+
+
+def useArray(count: int) -> bool:
+    """记录数量是否达到 NumPy 向量化统计阈值"""
+
+    return np is not None and 0 < NUMPY_THRESHOLD <= count
+
+
+def recordMark(item: Dict) -> List[str]:
+    """抽卡记录标识，用于核对统计摘要的检查点"""
+
+    return [item.get("id", ""), item["time"], item["name"]]
+
+
+def foldSummary(gachaLogs: Dict[str, List[Dict]], summary: Dict) -> Tuple[Dict, bool]:
+    """
+    在统计摘要基础上计入新增记录，检查点与记录不符的卡池从头重建，卡池信息更新时全部重建
+
+    * ``param gachaLogs: Dict[str, List[Dict]]`` 抽卡记录数据，各卡池记录从新到旧排列
+    * ``param summary: Dict`` 统计摘要，由 ``loadSummary()`` 读取，不会被修改
+    - ``return: Tuple[Dict, bool]`` 新的统计摘要、摘要是否有变更
+    """  # noqa: E501
+
+    # 摘要中的 UP 统计依赖卡池信息，卡池信息更新后同样从头重建
+    banners, changed = {}, (
+        summary.get("version") != SUMMARY_VERSION or summary.get("pools") != POOL_DIGEST
+    )
+    oldBanners: Dict = {} if changed else summary.get("banners", {})
+    for banner in RENDER_ORDER:
+        gachaList = gachaLogs.get(banner)
+        if not gachaList:
+            changed = changed or banner in oldBanners
+            continue
+        old, total = oldBanners.get(banner), len(gachaList)
+        folded = old["stat"]["total"] if old else 0
+        if (
+            old
+            and 0 < folded <= total
+            and old["first"] == recordMark(gachaList[-1])
+            and old["last"] == recordMark(gachaList[total - folded])
+        ):
+            # 新增记录总是位于列表最前
+            gachaStat = {**old["stat"], "star5": list(old["stat"]["star5"])}
+            delta = gachaList[: total - folded]
+        elif useArray(total):
+            gachaStat, delta = calcStatArray(banner, gachaList[::-1]), gachaList
+        else:
+            gachaStat, delta = newStat(), gachaList
+        if gachaStat["total"] < total:
+            for item in reversed(delta):
+                foldStat(gachaStat, banner, item)
+        if delta:
+            changed = True
+            logger.debug(f"卡池 {banner} 统计摘要计入 {len(delta)} 条记录")
+        banners[banner] = {
+            "first": recordMark(gachaList[-1]),
+            "last": recordMark(gachaList[0]),
+            "stat": gachaStat,
+        }
+    return {
+        "version": SUMMARY_VERSION,
+        "pools": POOL_DIGEST,
+        "banners": banners,
+    }, changed
+
+
+def loadSummary(uid: str, prefix: str = "gachastat") -> Dict:
+    """
+    读取本地摘要
+
+    * ``param uid: str`` 抽卡记录所属 UID
+    * ``param prefix: str = "gachastat"`` 摘要文件名前缀，统计摘要为 ``gachastat``
+    - ``return: Dict`` 摘要，不存在或无法读取时返回 ``{}``
+    """
+
+    summaryFile = LOCAL_DIR / f"{prefix}-{uid}.json"
+    if not summaryFile.exists():
+        return {}
+    try:
+        summary = json.loads(summaryFile.read_text(encoding="utf-8"))
+        assert isinstance(summary, Dict)
+        return summary
+    except Exception as e:
+        logger.opt(exception=e).warning(f"UID{uid} 的摘要 {prefix} 读取失败，将重新生成")
+        return {}
+
+
+def saveSummary(uid: str, summary: Dict, prefix: str = "gachastat") -> None:
+    """
+    保存本地摘要，保存失败时仅记录错误日志
+
+    * ``param uid: str`` 抽卡记录所属 UID
+    * ``param summary: Dict`` 摘要
+    * ``param prefix: str = "gachastat"`` 摘要文件名前缀，统计摘要为 ``gachastat``
+    """
+
+    summaryFile = LOCAL_DIR / f"{prefix}-{uid}.json"
+    try:
+        summaryFile.write_text(
+            json.dumps(summary, ensure_ascii=False), encoding="utf-8"
+        )
+        logger.debug(f"UID{uid} 的摘要 {prefix} 已更新")
+    except Exception as e:
+        logger.opt(exception=e).error(f"UID{uid} 的摘要 {prefix} 更新失败")
+
+
+def calcSummaryStat(
+    uid: str, gachaLogs: Dict[str, List[Dict]], save: bool = False
+) -> Dict[str, Dict]:
+    """
+    基于本地统计摘要获取各卡池统计数据，仅需计入摘要之后的新增记录
+
+    * ``param uid: str`` 抽卡记录所属 UID
+    * ``param gachaLogs: Dict[str, List[Dict]]`` 抽卡记录数据，各卡池记录从新到旧排列
+    * ``param save: bool = False`` 是否保存更新后的摘要，仅应在记录写入本地时启用
+    - ``return: Dict[str, Dict]`` 各卡池统计数据，按 301 302 200 100 排列，仅包含有记录的卡池
+    """  # noqa: E501
+
+    summary, changed = foldSummary(gachaLogs, loadSummary(uid))
+    if save and changed:
+        saveSummary(uid, summary)
+    return {banner: v["stat"] for banner, v in summary["banners"].items()}
+
+
+async def getStat(uid: str, gachaLogs: Dict[str, List[Dict]]) -> Dict[str, Dict]:
+    """
+    获取各卡池统计数据，不会修改本地统计摘要
+
+    * ``param uid: str`` 抽卡记录所属 UID
+    * ``param gachaLogs: Dict[str, List[Dict]]`` 抽卡记录数据，各卡池记录从新到旧排列
+    - ``return: Dict[str, Dict]`` 各卡池统计数据
+    """
+
+    return await run_sync(calcSummaryStat)(uid, gachaLogs)
@@ -0,0 +1,146 @@
+import asyncio
+from functools import partial
+from contextlib import contextmanager
+from multiprocessing import get_context, get_all_start_methods
+from typing import Any, Set, Literal, Callable, Iterator, Optional
+from concurrent.futures import Executor, ThreadPoolExecutor, ProcessPoolExecutor
+
+from nonebot.log import logger
+
+
+class PoolBusyError(Exception):
+    """任务池排队已满"""
+
+
+class PoolDuplicateError(Exception):
+    """同一用户已有任务在任务池中执行或排队"""
+
+
+class WorkerPool:
+    """
+    带有界队列的任务池，在独立的线程池或进程池中执行同步函数
+
+    * ``param name: str`` 任务池名称
+    * ``param mode: Literal["thread", "process"]`` 执行方式，进程池仅在支持 fork 的系统中可用
+    * ``param workers: int`` 最大并发任务数
+    * ``param queue: int`` 最大排队任务数，排队已满时提交任务将抛出 ``PoolBusyError``
+    * ``param initializer: Optional[Callable[[], Any]] = None`` 工作线程或工作进程启动时执行的初始化函数
+    """  # noqa: E501
+
+    def __init__(
+        self,
+        name: str,
+        mode: Literal["thread", "process"],
+        workers: int,
+        queue: int,
+        initializer: Optional[Callable[[], Any]] = None,
+    ) -> None:
+        self.name = name
+        self.initializer = initializer
+        self.mode = mode
+        self.workers = max(workers, 1)
+        self.queue = max(queue, 0)
+        self._executor: Optional[Executor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._waiting = 0
+        self._keys: Set[str] = set()
+
+    @property
+    def waiting(self) -> int:
+        """当前排队任务数"""
+
+        return self._waiting
+
+    def _getExecutor(self) -> Executor:
+        """按需创建执行器，进程池模式下应先由 ``start()`` 在启动时创建"""
+
+        if self._executor is not None:
+            return self._executor
+        if self.mode == "process" and "fork" not in get_all_start_methods():
+            logger.warning(f"{self.name}任务池无法在当前系统使用进程池，改用线程池")
+            self.mode = "thread"
+        if self.mode == "process":
+            # 工作进程直接继承已初始化的插件模块，无需重新导入 NoneBot
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=get_context("fork"),
+                initializer=self.initializer,
+            )
+        else:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.workers,
+                thread_name_prefix="gachalogs",
+                initializer=self.initializer,
+            )
+        logger.info(f"{self.name}任务池已启动：{self.mode} × {self.workers}")
+        return self._executor
+
+    def start(self) -> None:
+        """
+        启动执行器，进程池模式下立即创建全部工作进程
+
+        工作进程以 fork 方式创建，会复制当时其他线程持有的锁，应在插件启动时、尚未使用任何线程前调用
+        """  # noqa: E501
+
+        executor = self._getExecutor()
+        if self.mode == "process":
+            # fork 方式的进程池在首次提交任务时一次性创建全部工作进程
+            executor.submit(int)
+
+    async def run(self, func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """
+        提交同步函数至任务池执行并等待结果
+
+        * ``param func: Callable[..., Any]`` 同步函数，进程池模式下须为模块顶层函数
+        * ``param *args: Any`` 位置参数，进程池模式下须可被 pickle
+        * ``param **kwargs: Any`` 关键字参数，进程池模式下须可被 pickle
+        - ``return: Any`` 函数返回值
+        """
+
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.workers)
+        if self._slots.locked() and self._waiting >= self.queue:
+            raise PoolBusyError(f"{self.name}任务池排队已满")
+        self._waiting += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self._waiting -= 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                self._getExecutor(), partial(func, *args, **kwargs)
+            )
+        finally:
+            self._slots.release()
+
+    @property
+    def position(self) -> int:
+        """新提交的任务需要排队时的排队位次，可立即执行时为 0"""
+
+        if self._slots is None or not self._slots.locked():
+            return 0
+        return self._waiting + 1
+
+    @contextmanager
+    def occupy(self, key: str) -> Iterator[None]:
+        """
+        占用用户标识直至退出上下文，用于限制同一用户同时只能有一个任务
+
+        * ``param key: str`` 用户标识，已被占用时抛出 ``PoolDuplicateError``
+        """
+
+        if key in self._keys:
+            raise PoolDuplicateError(f"{self.name}任务池已有 {key} 的任务")
+        self._keys.add(key)
+        try:
+            yield
+        finally:
+            self._keys.discard(key)
+
+    def shutdown(self) -> None:
+        """关闭执行器"""
+
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
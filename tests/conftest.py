@@ -0,0 +1,33 @@
+import os
+import atexit
+import shutil
+import tempfile
+from pathlib import Path
+
+import nonebot
+import matplotlib
+from PIL import Image
+
+# 插件在导入时读取 NoneBot 配置并下载缺失的资源，测试前需先初始化
+# 默认使用离线测试资源：卡池信息来自 tests/data，字体使用 matplotlib 自带字体，成就背景临时生成
+resources = Path(tempfile.mkdtemp(prefix="gachalogs-test-"))
+atexit.register(shutil.rmtree, resources, True)
+shutil.copytree(Path(__file__).parent / "data", resources, dirs_exist_ok=True)
+for name in ["achieve-nodetail.png", "achieve-detail.png"]:
+    Image.new("RGBA", (700, 100), "#f0ece3").save(resources / "gachalogs" / name)
+font = str(Path(matplotlib.get_data_path()) / "fonts" / "ttf" / "DejaVuSans.ttf")
+config = {
+    "resources_dir": str(resources),
+    "gachalogs_font": font,
+    "gachalogs_pie_font": font,
+    "gachalogs_achieve_font": font,
+}
+# 资源目录等配置可通过同名环境变量指定
+config.update(
+    {
+        k.lower(): v
+        for k, v in os.environ.items()
+        if k.lower().startswith("gachalogs_") or k.lower() == "resources_dir"
+    }
+)
+nonebot.init(driver="~none", **config)
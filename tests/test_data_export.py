@@ -0,0 +1,102 @@
+import copy
+import json
+import random
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from test_gacha_analysis import makeLogs
+
+from nonebot_plugin_gachalogs import data_export
+
+
+def test_same_second_exports_do_not_share_files(tmp_path, monkeypatch):
+    monkeypatch.setattr(data_export, "LOCAL_DIR", tmp_path)
+    monkeypatch.setattr(data_export, "EXPORT_DIR", tmp_path)
+    logs, cachePath = makeLogs(), tmp_path / "gachalogs-123456789-digest-v2.json"
+    # 同一 UID 同一秒内的两次导出共用同一缓存文件，各自得到独立的待发送文件
+    first = data_export.writeGachaFile("123456789", logs, "json", {}, cachePath)
+    second = data_export.writeGachaFile("123456789", logs, "json", {}, cachePath)
+    assert first != second and cachePath.exists()
+    first.unlink()
+    assert len(json.loads(second.read_text(encoding="utf-8"))["list"]) == 400
+    # 写入完成后不残留暂存文件
+    assert not list(tmp_path.glob(".*.tmp"))
+
+
+def test_write_parquet(tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    logs = makeLogs()
+    filePath = data_export.writeParquet(logs, tmp_path / "logs.parquet")
+    table = pq.read_table(filePath)
+    assert table.column_names == data_export.UIGF_FIELDS
+    # 字段均以字符串写入，缺失字段为空字符串
+    assert table.to_pylist() == [
+        {k: str(item.get(k) or "") for k in data_export.UIGF_FIELDS}
+        for item in data_export.iterUIGF(logs)
+    ]
+
+
+def test_backup_error_stops_pending_exports(tmp_path, monkeypatch):
+    outDir, exportDir = tmp_path / "out", tmp_path / "exports"
+    outDir.mkdir()
+    exportDir.mkdir()
+    monkeypatch.setattr(data_export, "LOCAL_DIR", outDir)
+    monkeypatch.setattr(data_export, "EXPORT_DIR", exportDir)
+    cfg = {}
+    for i in range(8):
+        logsFile = tmp_path / f"gachalogs-12345678{i}.json"
+        logsFile.write_text(json.dumps(makeLogs(20)), encoding="utf-8")
+        cfg[str(i)] = {"logs": str(logsFile)}
+
+    async def configHelper(qq):
+        return cfg
+
+    async def onProgress(done, total):
+        raise RuntimeError("进度报告出错")
+
+    monkeypatch.setattr(data_export, "configHelper", configHelper)
+    res = asyncio.run(data_export.gnrtBackupZip("json", onProgress))
+    assert res["error"] == "因为 RuntimeError 打包失败了.."
+    # 打包中止后不残留导出文件及打包文件，也不写入导出文件缓存
+    assert not list(outDir.iterdir()) and not list(exportDir.iterdir())
+
+
+def legacyUIGF(gachaLogs: dict) -> list:
+    # 改为逐条生成前 transUIGF 的转换方式，用于核对记录顺序及补充的 ID
+    uigfList = []
+    for banner in data_export.GACHA_TYPE:
+        gachaLog = sorted(reversed(gachaLogs.get(banner, [])), key=lambda i: i["time"])
+        uigfList.extend({**item, "uigf_gacha_type": banner} for item in gachaLog)
+    uigfList = sorted(uigfList, key=lambda i: i["time"])
+    id = data_export.gnrtId()
+    for item in uigfList:
+        if not item.get("id"):
+            item["id"] = next(id)
+    return sorted(uigfList, key=lambda i: i["id"])
+
+
+@pytest.mark.parametrize("missing", [0, 0.3, 1])
+def test_uigf_order_matches_legacy(missing):
+    rnd, logs, nextId = random.Random(missing), {}, 1670000000000000000
+    for banner in ["100", "200", "301", "302"]:
+        records, pullTime = [], datetime(2023, 1, 1)
+        for _ in range(60):
+            # 十连记录时间相同，不同卡池的记录也可能时间相同
+            pullTime += timedelta(minutes=rnd.choice([0, 1, 5]))
+            for _ in range(rnd.choice([1, 10])):
+                nextId += 1
+                record = {"time": pullTime.strftime("%Y-%m-%d %H:%M:%S")}
+                if rnd.random() >= missing:
+                    record["id"] = str(nextId)
+                elif rnd.random() < 0.5:
+                    record["id"] = ""
+                records.append({**record, "gacha_type": banner, "name": "冷刃"})
+        logs[banner] = records[::-1]
+    source = copy.deepcopy(logs)
+    # 逐条比较字段及字段顺序，写入的 JSON 与原先一致
+    assert [list(i.items()) for i in data_export.iterUIGF(logs)] == [
+        list(i.items()) for i in legacyUIGF(logs)
+    ]
+    # 转换不修改原始记录
+    assert logs == source
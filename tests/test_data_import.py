@@ -0,0 +1,131 @@
+import json
+import random
+import asyncio
+
+import pytest
+
+from nonebot_plugin_gachalogs import data_import
+from nonebot_plugin_gachalogs.data_import import GachaFileError, GachaFileParser
+
+
+def uigfRecord(idx: int, **fields: str) -> dict:
+    record = {
+        "uid": "123456789",
+        "gacha_type": "200",
+        "item_id": "",
+        "count": "1",
+        "time": f"2023-01-{idx % 28 + 1:02d} 12:00:00",
+        "name": "冷刃",
+        "lang": "zh-cn",
+        "item_type": "武器",
+        "rank_type": "3",
+        "id": str(1670000000000000000 + idx),
+        "uigf_gacha_type": "200",
+    }
+    record.update(fields)
+    return record
+
+
+def uigfText(records: list) -> str:
+    return json.dumps(
+        {"info": {"uid": "123456789"}, "list": records}, ensure_ascii=False
+    )
+
+
+def parse(text: str, chunks: int = 1) -> GachaFileParser:
+    parser, rnd = GachaFileParser(), random.Random(chunks)
+    cuts = sorted(rnd.sample(range(1, len(text)), chunks - 1)) if chunks > 1 else []
+    for start, end in zip([0] + cuts, cuts + [len(text)]):
+        parser.feed(text[start:end])
+    parser.feed("", True)
+    parser.close()
+    return parser
+
+
+def test_valid_uigf():
+    parser = parse(uigfText([uigfRecord(i) for i in range(20)]))
+    assert parser.close()[1:] == ("123456789", "uigf")
+    assert len(parser.data["list"]) == 20
+
+
+def test_impossible_date_rejected():
+    records = [uigfRecord(i) for i in range(5)]
+    records[3]["time"] = "2023-02-30 12:00:00"
+    with pytest.raises(GachaFileError, match=r"list\[3\]：time 2023-02-30"):
+        parse(uigfText(records))
+
+
+@pytest.mark.parametrize("uid", ["", "abc"])
+def test_invalid_record_uid_rejected(uid):
+    records = [uigfRecord(i) for i in range(5)]
+    records[0]["uid"] = uid
+    with pytest.raises(GachaFileError, match=r"list\[0\]：uid"):
+        parse(uigfText(records))
+
+
+def test_numbers_split_across_chunks():
+    data = json.loads(uigfText([uigfRecord(i) for i in range(2)]))
+    data.update({"version": 890.5, "extra": [-1.25e-3, 12, 3e5, 0.0]})
+    text = json.dumps(data, ensure_ascii=False)
+    # 在每个位置拆分为两段，数字被截断于 "." "e" 等字符之后时仍能正确解析
+    for cut in range(1, len(text)):
+        parser = GachaFileParser()
+        parser.feed(text[:cut])
+        parser.feed(text[cut:])
+        parser.feed("", True)
+        assert parser.data == data, text[:cut]
+
+
+def test_invalid_record_aborts_before_end():
+    records = [uigfRecord(i) for i in range(5)]
+    records[1]["uid"] = "abc"
+    text = uigfText(records)
+    parser = GachaFileParser()
+    # 异常记录所在数据接收后立即中止，无需等待后续记录
+    with pytest.raises(GachaFileError, match=r"list\[1\]") as e:
+        parser.feed(text[: text.index("2023-01-04")])
+    assert e.value.partial
+
+
+def test_merge_dedupes_by_trusted_id(monkeypatch):
+    local = {
+        "200": [
+            uigfRecord(4),
+            uigfRecord(2, id="1000000000000002"),
+            uigfRecord(1),
+        ]
+    }
+    saved = {}
+
+    async def logsHelper(logsFile, logs=None):
+        saved.update(logs or {})
+        return "123456789", local
+
+    async def configHelper(qq, config):
+        return {}
+
+    monkeypatch.setattr(data_import, "logsHelper", logsHelper)
+    monkeypatch.setattr(data_import, "configHelper", configHelper)
+    records = [
+        # 已存在的官方 id
+        uigfRecord(1),
+        # 本地同一时刻的记录 id 不可信，按时刻判断为已存在
+        uigfRecord(2, id="1670000000000000102"),
+        # 新增记录
+        uigfRecord(3),
+        # 与本地记录同一时刻但 id 不同的其他卡池记录
+        uigfRecord(4, gacha_type="301", id="1670000000000000104"),
+    ]
+    config = {"logs": "gachalogs-123456789.json"}
+    uigf = json.loads(uigfText(records))
+    merged, res = asyncio.run(
+        data_import.mergeLogs(uigf, config, "10001", "123456789", 0)
+    )
+    assert "error" not in res and saved == merged
+    assert [log["id"] for log in merged["301"]] == ["1670000000000000104"]
+    assert [log["time"][:10] for log in merged["200"]] == [
+        "2023-01-05",
+        "2023-01-04",
+        "2023-01-03",
+        "2023-01-02",
+    ]
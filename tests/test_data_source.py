@@ -0,0 +1,57 @@
+import json
+import asyncio
+import threading
+
+import pytest
+
+from nonebot_plugin_gachalogs import data_source
+
+
+def failSummary(uid, gachaLogs, save=False):
+    raise RuntimeError("摘要更新出错")
+
+
+@pytest.mark.parametrize("failed", ["calcSummaryStat", "calcSummaryAchieve"])
+def test_summary_error_keeps_logs_write(tmp_path, monkeypatch, failed):
+    calls = []
+    for name in ["calcSummaryStat", "calcSummaryAchieve"]:
+        monkeypatch.setattr(
+            data_source,
+            name,
+            failSummary if name == failed else lambda *a, n=name, **k: calls.append(n),
+        )
+    logsFile, logs = tmp_path / "gachalogs-123456789.json", {"200": []}
+    uid, _ = asyncio.run(data_source.logsHelper(logsFile, logs))
+    assert uid == "123456789"
+    assert json.loads(logsFile.read_text(encoding="utf-8")) == logs
+    # 一个摘要更新失败时另一个摘要仍会更新
+    assert len(calls) == 1 and calls[0] != failed
+
+
+def test_delete_removes_export_cache(tmp_path, monkeypatch):
+    exportDir = tmp_path / "cached-exports"
+    exportDir.mkdir()
+    monkeypatch.setattr(data_source, "LOCAL_DIR", tmp_path)
+    monkeypatch.setattr(data_source, "EXPORT_DIR", exportDir)
+    logsFile = tmp_path / "gachalogs-123456789.json"
+    logsFile.write_text("{}", encoding="utf-8")
+    cached = exportDir / "gachalogs-123456789-digest-v2.json"
+    other = exportDir / "gachalogs-987654321-digest-v2.json"
+    cached.touch()
+    other.touch()
+    asyncio.run(data_source.logsHelper(logsFile, {"delete": True}))
+    assert not logsFile.exists() and not cached.exists() and other.exists()
+
+
+def test_read_logs_off_event_loop(tmp_path, monkeypatch):
+    logsFile, logs = tmp_path / "gachalogs-123456789.json", {"200": []}
+    logsFile.write_text(json.dumps(logs), encoding="utf-8")
+    threads = []
+
+    def readLogs(file):
+        threads.append(threading.current_thread())
+        return json.loads(file.read_text(encoding="utf-8"))
+
+    monkeypatch.setattr(data_source, "readLogs", readLogs)
+    assert asyncio.run(data_source.logsHelper(logsFile)) == ("123456789", logs)
+    assert threads and threads[0] is not threading.main_thread()
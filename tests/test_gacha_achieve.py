@@ -0,0 +1,21 @@
+import copy
+
+from test_gacha_analysis import makeLogs
+
+from nonebot_plugin_gachalogs import gacha_achieve
+
+
+def test_achieve_rebuilt_after_pool_info_change(monkeypatch):
+    logs = makeLogs()
+    fresh, _, changed = gacha_achieve.foldAchieve(logs, {})
+    assert changed
+    summary, _, changed = gacha_achieve.foldAchieve(logs, copy.deepcopy(fresh))
+    assert not changed
+
+    # 模拟卡池信息更新前保存的摘要，其中的规则状态已与当前卡池信息不符
+    stale = copy.deepcopy(fresh)
+    stale["rules"] = {name: {} for name in stale["rules"]}
+    monkeypatch.setattr(gacha_achieve, "POOL_DIGEST", "updated")
+    summary, _, changed = gacha_achieve.foldAchieve(logs, stale)
+    assert changed and summary["pools"] == "updated"
+    assert summary["rules"] == fresh["rules"]
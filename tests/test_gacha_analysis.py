@@ -0,0 +1,113 @@
+import copy
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+from nonebot_plugin_gachalogs import gacha_analysis
+
+
+def makeLogs(count: int = 200) -> dict:
+    logs, start = {}, datetime(2023, 1, 1, 12)
+    for bannerIdx, banner in enumerate(["301", "200"]):
+        records = []
+        for i in range(count):
+            star5 = i % 50 == 49
+            records.append(
+                {
+                    "uid": "123456789",
+                    "gacha_type": banner,
+                    "item_id": "",
+                    "count": "1",
+                    "time": (start + timedelta(minutes=i, days=bannerIdx)).strftime(
+                        "%Y-%m-%d %H:%M:%S"
+                    ),
+                    "name": "刻晴" if star5 else "冷刃",
+                    "lang": "zh-cn",
+                    "item_type": "角色" if star5 else "武器",
+                    "rank_type": "5" if star5 else "3",
+                    "id": str(1670000000000000000 + bannerIdx * count + i),
+                }
+            )
+        logs[banner] = records[::-1]
+    return logs
+
+
+def test_summary_rebuilt_after_pool_info_change(monkeypatch):
+    logs = makeLogs()
+    fresh, changed = gacha_analysis.foldSummary(logs, {})
+    assert changed
+    # 模拟卡池信息更新前保存的摘要，其中的统计已与当前卡池信息不符
+    stale = copy.deepcopy(fresh)
+    stale["banners"]["301"]["stat"]["cntChar5"] += 100
+    summary, changed = gacha_analysis.foldSummary(logs, stale)
+    assert not changed
+    assert summary["banners"]["301"]["stat"]["cntChar5"] == 104
+
+    monkeypatch.setattr(gacha_analysis, "POOL_DIGEST", "updated")
+    summary, changed = gacha_analysis.foldSummary(logs, stale)
+    assert changed and summary["pools"] == "updated"
+    assert summary["banners"] == fresh["banners"]
+
+
+def test_pity_resets_after_five_star():
+    pity = gacha_analysis.calcPity(makeLogs(120))
+    # 每 50 抽出一个五星，五星记录为出货时的抽数
+    assert set(pity) == {"301", "200"}
+    assert pity["200"] == (*range(1, 51), *range(1, 51), *range(1, 21))
+
+
+def randomLogs(count: int, seed: int) -> dict:
+    rnd, logs = random.Random(seed), {}
+    # 覆盖首个卡池开放前、两个 301 卡池重叠期间及卡池间隔
+    start, span = datetime(2022, 12, 25), timedelta(days=50).total_seconds()
+    items = {
+        5: [("角色", "雷电将军"), ("角色", "刻晴"), ("角色", "胡桃"), ("武器", "薙草之稻光")],
+        4: [("角色", "行秋"), ("角色", "砂糖"), ("武器", "西风剑"), ("武器", "祭礼弓")],
+        3: [("武器", "冷刃")],
+    }
+    for banner, gachaTypes in [("301", ["301", "400"]), ("302", ["302"])]:
+        records, idx = [], 0
+        while idx < count:
+            # 十连的记录时间相同
+            pulls = rnd.choice([1, 10])
+            pullTime = start + timedelta(seconds=span * idx / count)
+            gachaType = rnd.choice(gachaTypes)
+            for _ in range(pulls):
+                rank = rnd.choices([5, 4, 3], [2, 13, 85])[0]
+                itemType, name = rnd.choice(items[rank])
+                records.append(
+                    {
+                        "gacha_type": gachaType,
+                        "time": pullTime.strftime("%Y-%m-%d %H:%M:%S"),
+                        "name": name,
+                        "item_type": itemType,
+                        "rank_type": str(rank),
+                    }
+                )
+            idx += pulls
+        logs[banner] = records[::-1]
+    return logs
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_numpy_stat_matches_python(seed):
+    pytest.importorskip("numpy")
+    for banner, gachaList in randomLogs(3000, seed).items():
+        items = gachaList[::-1]
+        expected = gacha_analysis.newStat()
+        for item in items:
+            gacha_analysis.foldStat(expected, banner, item)
+        assert gacha_analysis.calcStatArray(banner, items) == expected
+
+
+def test_numpy_summary_above_threshold(monkeypatch):
+    pytest.importorskip("numpy")
+    # 各卡池记录数均达到阈值时使用向量化统计
+    logs = randomLogs(gacha_analysis.NUMPY_THRESHOLD, 0)
+    assert all(gacha_analysis.useArray(len(v)) for v in logs.values())
+    summary, _ = gacha_analysis.foldSummary(logs, {})
+    # 禁用 NumPy 后逐条计入的摘要与向量化统计一致
+    monkeypatch.setattr(gacha_analysis, "NUMPY_THRESHOLD", 0)
+    assert not any(gacha_analysis.useArray(len(v)) for v in logs.values())
+    assert gacha_analysis.foldSummary(logs, {})[0] == summary